@@ -1,16 +1,26 @@
 # api.py
 
 from query import ask as core_ask
-from ux.ux_boat import ux_response
+from prefilter import prefilter
+from ux.ux_boat import ux_help
 
 
-def handle_question(user_question: str) -> str:
+def handle_question(user_question: str, chat_id=None, retrieved=None, kb=None) -> str:
     """
     Hlavní router dotazu.
     """
-    answer = core_ask(user_question)
+    # pozdrav, žádost o radu, jiný jazyk, opakovaný dotaz → bez embeddingu a LLM
+    local = prefilter.local_answer(user_question, chat_id)
 
+    if local is not None:
+        return local
+
+    answer = core_ask(user_question, chat_id, retrieved=retrieved, kb=kb)
+
+    # mimo data → připoj, na jaké otázky nástroj odpovídá
     if answer.startswith("NEDOLOŽENO"):
-        return ux_response(user_question, answer)
+        answer = f"{answer}\n\n{ux_help()}"
+
+    prefilter.remember(user_question, chat_id, answer)
 
     return answer
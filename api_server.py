@@ -0,0 +1,225 @@
+# api_server.py
+#
+# Asynchronní HTTP API nad api.handle_question – sdílený backend
+# pro web widget a další front-endy.
+#
+#   python api_server.py
+#
+# GET  /health     → {chunks, index_version, scheduler, models, prefilter,
+#                     knowledge_bases, memory}
+# POST /ask        {"question": "...", "chat_id"?: ..., "kb"?: ...} → {"answer": "..."}
+# POST /ask_batch  {"questions": [...], "chat_id"?: ..., "kb"?: ...}
+#                  → application/x-ndjson, jeden řádek na hotovou odpověď
+#                    {"i": pořadí v dávce, "answer": "...", "ms": ...}
+#
+# Dávka: jeden retrieve_batch (jeden embedding + jedno FAISS hledání pro
+# všechny otázky), LLM volání pak běží souběžně – kolik jich reálně letí,
+# řídí plánovač v llm.py.
+
+import memory  # první – LOW_MEMORY mění výchozí limity ostatních modulů
+
+import os
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+import api
+import query
+import prefilter
+import router
+import sessions
+from scheduler import scheduler
+
+
+# ---------- CONFIG ----------
+HOST = os.getenv("API_HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", os.getenv("API_PORT", "8080")))
+
+MAX_BATCH = int(os.getenv("API_MAX_BATCH", "32"))
+MAX_QUESTION_CHARS = 2000
+
+# vlákna pro blokující ask() – čekají hlavně ve frontě plánovače
+WORKERS = int(os.getenv("API_WORKERS", "32"))
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="api")
+
+
+def _run(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(_executor, lambda: fn(*args, **kwargs))
+
+
+def _bad_request(message: str):
+    return web.json_response({"error": message}, status=400)
+
+
+async def _read_json(request) -> dict:
+
+    try:
+        payload = await request.json()
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+    return payload if isinstance(payload, dict) else None
+
+
+def _valid_question(q) -> bool:
+    return isinstance(q, str) and len(q) <= MAX_QUESTION_CHARS
+
+
+def _valid_chat_id(chat_id) -> bool:
+    # klíč v OrderedDict prefiltru, sezení a plánovače → jen hashovatelné skaláry
+    return chat_id is None or (
+        isinstance(chat_id, (str, int)) and not isinstance(chat_id, bool)
+    )
+
+
+def _valid_kb(name) -> bool:
+    return name is None or name in query.registry.names()
+
+
+# ---------- HANDLERS ----------
+async def health(request):
+
+    return web.json_response({
+        "chunks": len(query.chunks),
+        "index_version": query.INDEX_VERSION,
+        "scheduler": scheduler.snapshot(),
+        "models": router.stats.snapshot(),
+        "prefilter": prefilter.prefilter.stats,
+        "knowledge_bases": query.registry.snapshot(),
+        "memory": memory.report(),
+    })
+
+
+async def ask(request):
+
+    payload = await _read_json(request)
+
+    if payload is None or not _valid_question(payload.get("question")):
+        return _bad_request(
+            f"očekávám {{\"question\": \"...\"}} (≤ {MAX_QUESTION_CHARS} znaků)"
+        )
+
+    if not _valid_chat_id(payload.get("chat_id")):
+        return _bad_request("chat_id: řetězec nebo celé číslo")
+
+    if not _valid_kb(payload.get("kb")):
+        return _bad_request(f"kb: jedna z {query.registry.names()}")
+
+    t0 = time.perf_counter()
+
+    answer = await _run(
+        api.handle_question,
+        payload["question"],
+        payload.get("chat_id"),
+        kb=payload.get("kb")
+    )
+
+    return web.json_response({
+        "answer": answer,
+        "ms": round((time.perf_counter() - t0) * 1000),
+    })
+
+
+async def ask_batch(request):
+
+    payload = await _read_json(request)
+    questions = payload.get("questions") if payload else None
+
+    if (
+        not isinstance(questions, list)
+        or not 0 < len(questions) <= MAX_BATCH
+        or not all(_valid_question(q) for q in questions)
+    ):
+        return _bad_request(f"očekávám {{\"questions\": [...]}} (1–{MAX_BATCH} otázek)")
+
+    if not _valid_chat_id(payload.get("chat_id")):
+        return _bad_request("chat_id: řetězec nebo celé číslo")
+
+    if not _valid_kb(payload.get("kb")):
+        return _bad_request(f"kb: jedna z {query.registry.names()}")
+
+    chat_id = payload.get("chat_id")
+    t0 = time.perf_counter()
+
+    # stejná báze, jakou pak vybere ask()
+    kb, base = await _run(query.registry.resolve, chat_id, payload.get("kb"))
+
+    # doplňující otázky berou evidenci ze sezení, lokálně vyřízené nic nehledají
+    fresh = [
+        i for i, q in enumerate(questions)
+        if prefilter.classify(q) is None
+        and not (chat_id is not None and sessions.is_follow_up(q))
+    ]
+
+    retrieved = {}
+
+    if fresh:
+        try:
+            results = await _run(
+                base.retrieve_batch, [questions[i] for i in fresh]
+            )
+            retrieved = dict(zip(fresh, results))
+        except Exception as e:
+            # bez dávky si každá otázka hledá sama
+            print("BATCH RETRIEVAL ERROR:", e)
+
+    response = web.StreamResponse(
+        headers={"Content-Type": "application/x-ndjson; charset=utf-8"}
+    )
+    await response.prepare(request)
+
+    async def one(i):
+        try:
+            answer = await _run(
+                api.handle_question, questions[i], chat_id,
+                retrieved=retrieved.get(i), kb=kb
+            )
+            return {"i": i, "answer": answer}
+        except Exception as e:
+            print("BATCH ERROR:", e)
+            return {"i": i, "error": "Model dočasně neodpovídá."}
+
+    # odpovědi se posílají v pořadí dokončení, ne v pořadí dotazů
+    for done in asyncio.as_completed([one(i) for i in range(len(questions))]):
+        line = await done
+        line["ms"] = round((time.perf_counter() - t0) * 1000)
+        await response.write(
+            (json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8")
+        )
+
+    await response.write_eof()
+    return response
+
+
+def create_app() -> web.Application:
+
+    app = web.Application(client_max_size=256 * 1024)
+
+    app.router.add_get("/health", health)
+    app.router.add_post("/ask", ask)
+    app.router.add_post("/ask_batch", ask_batch)
+
+    return app
+
+
+def main():
+
+    print(f"▶ API http://{HOST}:{PORT} ({len(query.chunks)} chunků)")
+
+    print(memory.format_report())
+
+    try:
+        memory.check_startup()
+    except memory.MemoryBudgetExceeded as e:
+        raise SystemExit(f"MEMORY BUDGET: {e}")
+
+    web.run_app(create_app(), host=HOST, port=PORT, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# bench_classifier.py
+#
+# Porovnání klasifikátoru vrstev: původní substring pravidla vs. centroidy.
+#
+#   python bench_classifier.py
+#
+# ALLOWED_QUESTIONS se hodnotí leave-one-out (otázka není ve svém centroidu),
+# EXTRA_LABELED jsou otázky mimo trénovací množinu.
+
+import time
+
+import classifier
+import retrieval
+from ux.allowed_questions import ALLOWED_QUESTIONS
+
+
+EXTRA_LABELED = [
+    ("Které platformy po virálu zrušily monetizaci?", "raw"),
+    ("Kolik tvůrců podepsalo smlouvu hned po virálu?", "raw"),
+    ("Co se stalo s tvůrci z Vine?", "raw"),
+    ("Byly content houses s nezletilými?", "raw"),
+    ("Přestali někteří tvůrci po slávě publikovat?", "raw"),
+    ("Jaké zákony upravují práci dětí v online obsahu?", "raw"),
+    ("Jak se mění sebepojetí po náhlé viditelnosti?", "synth"),
+    ("Opakuje se, že se pozornost přesouvá z obsahu na osobu?", "synth"),
+    ("Co se typicky děje se sociálním okruhem virální osoby?", "synth"),
+    ("Jak tvůrci reagují na metriky po virálu?", "synth"),
+    ("Jak se mění finanční očekávání po úspěchu?", "synth"),
+    ("Proč se rozhodnutí po virálu dělají tak rychle?", "synth"),
+    ("Co nelze z dostupných dat o virálech zjistit?", "meta"),
+    ("Proč jsou příběhy úspěšných tvůrců zkreslené?", "meta"),
+    ("Jaké informace o algoritmech tvůrci nemají?", "meta"),
+    ("Dá se predikovat, jestli úspěch vydrží?", "meta"),
+    ("Víme něco o dlouhodobých psychických dopadech?", "meta"),
+    ("Jsou smluvní důsledky v době podpisu srozumitelné?", "meta"),
+]
+
+
+def _score(predict, labeled):
+
+    top1 = 0
+    covered = 0
+    layers_returned = 0
+
+    for vec_or_q, label in labeled:
+        pred = predict(vec_or_q)
+        top1 += pred[0] == label
+        covered += label in pred
+        layers_returned += len(pred)
+
+    n = len(labeled)
+
+    return {
+        "top1": top1 / n,
+        "covered": covered / n,
+        "avg_layers": layers_returned / n,
+    }
+
+
+def _latency_us(fn, items, repeat=200):
+
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for x in items:
+            fn(x)
+    return (time.perf_counter() - t0) / (repeat * len(items)) * 1e6
+
+
+def main():
+
+    allowed = [(q, layer) for layer, qs in ALLOWED_QUESTIONS.items() for q in qs]
+    labeled = allowed + EXTRA_LABELED
+
+    texts = [q for q, _ in labeled]
+    vecs = retrieval.encode(texts)
+
+    chunk_vecs = retrieval.index.vectors()
+    chunk_layers = [c["layer"] for c in retrieval.chunks]
+
+    # --- leave-one-out pro ALLOWED_QUESTIONS ---
+    loo_preds = []
+
+    for i, (q, label) in enumerate(allowed):
+
+        question_vecs = {}
+        for j, (_, layer) in enumerate(allowed):
+            if j != i:
+                question_vecs.setdefault(layer, []).append(vecs[j])
+
+        layers, centroids = classifier.build_centroids(
+            question_vecs, chunk_vecs, chunk_layers
+        )
+        loo_preds.append(
+            (classifier.classify(vecs[i], layers, centroids), label)
+        )
+
+    # --- held-out s plnými centroidy ---
+    layers, centroids = retrieval.CLASSIFIER_LAYERS, retrieval.CLASSIFIER_CENTROIDS
+    extra_vecs = vecs[len(allowed):]
+
+    rows = [
+        ("rules / allowed", _score(classifier.classify_rules, allowed)),
+        ("rules / extra", _score(classifier.classify_rules, EXTRA_LABELED)),
+        ("centroid / allowed (LOO)", _score(lambda p: p, loo_preds)),
+        ("centroid / extra", _score(
+            lambda v: classifier.classify(v, layers, centroids),
+            list(zip(extra_vecs, [label for _, label in EXTRA_LABELED]))
+        )),
+    ]
+
+    print(f"\n{'varianta':<26} {'top1':>6} {'pokryto':>8} {'vrstev':>7}")
+    for name, r in rows:
+        print(
+            f"{name:<26} {r['top1']:>6.2f} {r['covered']:>8.2f} "
+            f"{r['avg_layers']:>7.2f}"
+        )
+
+    rules_us = _latency_us(classifier.classify_rules, texts)
+    centroid_us = _latency_us(
+        lambda v: classifier.classify(v, layers, centroids), list(vecs)
+    )
+    embed_ms = _latency_us(
+        lambda q: retrieval._model_encode([q]),
+        texts[:5],
+        repeat=3
+    ) / 1000
+
+    print("\nlatence na volání")
+    print(f"  rules      {rules_us:8.1f} µs")
+    print(f"  centroid   {centroid_us:8.1f} µs  (embedding se sdílí s FAISS)")
+    print(f"  embedding  {embed_ms:8.1f} ms  (pro srovnání, platí se jednou)")
+
+
+if __name__ == "__main__":
+    main()
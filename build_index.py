@@ -0,0 +1,249 @@
+# build_index.py
+#
+# Postaví index/ z knowledge/3_index_ready/<vrstva>/*.txt
+# (chunk = odstavec oddělený prázdným řádkem).
+#
+#   python build_index.py                  # faiss.index + chunks.json + lexical.json
+#   python build_index.py --storage sq8    # komprimované vektory + vectors.npy pro re-ranking
+#   python build_index.py --lexical-only   # jen lexical.json z existujícího chunks.json
+#   python build_index.py --report         # paměť vs. recall všech úložišť proti flat
+#   python build_index.py --no-dedupe      # bez slučování téměř stejných chunků
+
+import os
+import json
+import argparse
+
+import dedupe
+import classifier
+import lexical
+import embed_cache
+import vector_store
+
+
+# ---------- CONFIG ----------
+KNOWLEDGE_DIR = os.path.join("knowledge", "3_index_ready")
+INDEX_DIR = "index"
+
+LAYERS = ["raw", "synth", "meta"]
+
+EMBED_MODEL = "all-MiniLM-L6-v2"
+
+
+# ---------- LOAD ----------
+def load_chunks(folder: str = KNOWLEDGE_DIR) -> list[dict]:
+
+    chunks = []
+
+    for layer in LAYERS:
+
+        layer_dir = os.path.join(folder, layer)
+        if not os.path.isdir(layer_dir):
+            continue
+
+        for file in sorted(os.listdir(layer_dir)):
+            if not file.endswith(".txt"):
+                continue
+
+            with open(os.path.join(layer_dir, file), "r", encoding="utf-8") as f:
+                text = f.read()
+
+            for para in text.split("\n\n"):
+                para = para.strip()
+                if para:
+                    chunks.append({
+                        "text": para,
+                        "source": f"{layer}/{file}",
+                        "layer": layer
+                    })
+
+    return chunks
+
+
+# ---------- BUILD ----------
+def build_lexical(chunks: list[dict], out_dir: str = INDEX_DIR):
+
+    idx = lexical.BM25Index.build([c["text"] for c in chunks])
+    idx.save(os.path.join(out_dir, "lexical.json"))
+
+    print(f"▶ lexical.json: {len(idx.postings)} termů, {idx.n_docs} chunků")
+
+
+def embed_chunks(chunks: list[dict]):
+
+    from sentence_transformers import SentenceTransformer
+
+    model = None
+
+    def model_encode(texts):
+        nonlocal model
+        if model is None:
+            model = SentenceTransformer(EMBED_MODEL)
+        return model.encode(
+            texts,
+            normalize_embeddings=True,
+            show_progress_bar=True
+        ).astype("float32")
+
+    # texty z minulých buildů se berou z cache, model se načte jen při novém textu
+    cache = embed_cache.EmbeddingCache(EMBED_MODEL)
+    vectors = cache.encode(model_encode, [c["text"] for c in chunks])
+
+    print(
+        f"▶ embeddingy: {cache.stats['hits']} z cache, "
+        f"{cache.stats['misses']} nově spočítáno"
+    )
+
+    return vectors
+
+
+def collapse_duplicates(chunks: list[dict], vectors):
+
+    chunks_out, vectors_out, clusters = dedupe.collapse(chunks, vectors)
+
+    print(
+        f"▶ téměř stejné chunky: {len(chunks)} → {len(chunks_out)} "
+        f"({len(clusters)} clusterů)"
+    )
+
+    for ids in clusters:
+        print("  · " + " | ".join(
+            f"{chunks[i]['source']}: {chunks[i]['text'][:40]!r}" for i in ids
+        ))
+
+    return chunks_out, vectors_out
+
+
+def build_dense(chunks: list[dict], out_dir: str = INDEX_DIR,
+                storage: str = "flat", vectors=None):
+
+    if vectors is None:
+        vectors = embed_chunks(chunks)
+
+    store = vector_store.build(vectors, storage)
+
+    # centroidy vrstev teď, ať start nečte vectors.npy celý do RAM
+    centroids = classifier.chunk_centroids(vectors, [c["layer"] for c in chunks])
+    vector_store.save(store, out_dir, layer_centroids=centroids)
+
+    line = (
+        f"▶ {os.path.basename(store.path)}: {store.ntotal} vektorů, "
+        f"{storage}, {store.memory_bytes() / 1024:.0f} KiB"
+    )
+
+    if store.rerank_bytes():
+        line += (
+            f" + {vector_store.VECTORS_FILE} {store.rerank_bytes() / 1024:.0f} KiB "
+            f"(mmap, re-ranking)"
+        )
+
+    print(line)
+
+
+# ---------- REPORT ----------
+def storage_report(index_dir: str = INDEX_DIR, k: int = 8):
+    """
+    Pro každé úložiště: paměť indexu, velikost přesných vektorů pro
+    re-ranking (vectors.npy, mmap) a recall@k proti přesnému flat hledání
+    (bez re-rankingu a s ním). Dotazy = ALLOWED_QUESTIONS + eval otázky.
+
+    „úspora“ = RAM indexu vs. flat, „celkem“ = index + vectors.npy vs. flat
+    (disk, u studené cache stránek i RAM).
+    """
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    from ux.allowed_questions import ALLOWED_QUESTIONS
+
+    vectors = vector_store.load(index_dir).vectors()
+
+    questions = [q for qs in ALLOWED_QUESTIONS.values() for q in qs]
+
+    labels_path = os.path.join("eval", "retrieval_labels.json")
+    if os.path.exists(labels_path):
+        with open(labels_path, "r", encoding="utf-8") as f:
+            questions += [l["question"] for l in json.load(f)]
+
+    questions = sorted(set(questions))
+
+    model = SentenceTransformer(EMBED_MODEL)
+    q_vecs = model.encode(questions, normalize_embeddings=True).astype("float32")
+
+    k = min(k, len(vectors))
+    flat = vector_store.build(vectors, "flat")
+    truth = [set(flat.search(q, k)[1][0]) for q in q_vecs]
+
+    base = flat.memory_bytes()
+
+    print(f"\n{len(vectors)} vektorů × {vectors.shape[1]} dim, {len(questions)} dotazů, k={k}\n")
+    print(
+        f"{'úložiště':<8} {'paměť':>10} {'re-rank':>10} {'úspora':>7} "
+        f"{'celkem':>7} {'recall':>7} {'+rerank':>8}"
+    )
+
+    for storage in vector_store.STORAGES:
+
+        store = vector_store.build(vectors, storage)
+
+        recall_raw = np.mean([
+            len(t & set(store.search(q, k, rerank=False)[1][0])) / k
+            for q, t in zip(q_vecs, truth)
+        ])
+        recall_rr = np.mean([
+            len(t & set(store.search(q, k)[1][0])) / k
+            for q, t in zip(q_vecs, truth)
+        ])
+
+        mem = store.memory_bytes()
+        exact = store.rerank_bytes()
+
+        print(
+            f"{storage:<8} {mem / 1024:>8.1f}KiB {exact / 1024:>8.1f}KiB "
+            f"{1 - mem / base:>7.0%} {1 - (mem + exact) / base:>7.0%} "
+            f"{recall_raw:>7.3f} {recall_rr:>8.3f}"
+        )
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Build RAG indexu")
+    parser.add_argument("--knowledge", default=KNOWLEDGE_DIR)
+    parser.add_argument("--out", default=INDEX_DIR)
+    parser.add_argument("--storage", choices=vector_store.STORAGES, default="flat")
+    parser.add_argument("--lexical-only", action="store_true",
+                        help="jen BM25 nad existujícím chunks.json")
+    parser.add_argument("--report", action="store_true",
+                        help="porovnej paměť a recall úložišť proti flat")
+    parser.add_argument("--no-dedupe", action="store_true",
+                        help="neslučuj téměř stejné chunky")
+
+    args = parser.parse_args(argv)
+
+    if args.report:
+        storage_report(args.out)
+        return
+
+    os.makedirs(args.out, exist_ok=True)
+    chunks_path = os.path.join(args.out, "chunks.json")
+
+    if args.lexical_only:
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+
+        build_lexical(chunks, args.out)
+        return
+
+    chunks = load_chunks(args.knowledge)
+    vectors = embed_chunks(chunks)
+
+    if not args.no_dedupe:
+        chunks, vectors = collapse_duplicates(chunks, vectors)
+
+    build_dense(chunks, args.out, args.storage, vectors)
+
+    with open(chunks_path, "w", encoding="utf-8") as f:
+        json.dump(chunks, f, ensure_ascii=False, indent=2)
+
+    build_lexical(chunks, args.out)
+
+
+if __name__ == "__main__":
+    main()
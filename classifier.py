@@ -0,0 +1,128 @@
+# classifier.py
+#
+# Klasifikace vrstvy (raw / synth / meta) bez dalšího volání modelu:
+# embedding otázky, který ask() stejně počítá pro FAISS, se porovná
+# s centroidy vrstev (vzorové otázky + centroidy chunků z meta.json).
+
+import numpy as np
+
+
+# ---------- CONFIG ----------
+# váha vzorových otázek vs. chunků v centroidu
+QUESTION_WEIGHT = 0.6
+
+# druhá vrstva se přidá, pokud je skóre blíž než MARGIN
+MARGIN = 0.03
+
+
+def _unit(v):
+    n = np.linalg.norm(v)
+    return v / n if n else v
+
+
+# ---------- BUILD ----------
+def chunk_centroids(chunk_vecs, chunk_layers) -> dict:
+    """
+    {vrstva: jednotkový průměr vektorů jejích chunků}. Počítá se při
+    build_index.py a ukládá do meta.json – start pak nečte vectors.npy.
+    """
+    chunk_layers = np.asarray(chunk_layers)
+
+    return {
+        layer: _unit(np.asarray(chunk_vecs[chunk_layers == layer]).mean(axis=0))
+        for layer in sorted(set(chunk_layers.tolist()))
+    }
+
+
+def combine_centroids(question_vecs: dict, chunk_centroids: dict):
+    """
+    question_vecs:   {vrstva: matice embeddingů vzorových otázek}
+    chunk_centroids: {vrstva: centroid chunků} (viz chunk_centroids)
+
+    Vrací (seznam vrstev, matice centroidů [vrstvy x dim]).
+    """
+    layers = sorted(set(question_vecs) | set(chunk_centroids))
+    rows = []
+
+    for layer in layers:
+
+        parts = []
+        weights = []
+
+        q = question_vecs.get(layer)
+        if q is not None and len(q):
+            parts.append(_unit(np.asarray(q).mean(axis=0)))
+            weights.append(QUESTION_WEIGHT)
+
+        c = chunk_centroids.get(layer)
+        if c is not None:
+            parts.append(np.asarray(c, dtype="float32"))
+            weights.append(1.0 - QUESTION_WEIGHT)
+
+        rows.append(_unit(np.average(parts, axis=0, weights=weights)))
+
+    return layers, np.vstack(rows).astype("float32")
+
+
+def build_centroids(question_vecs: dict, chunk_vecs, chunk_layers):
+    """
+    question_vecs: {vrstva: matice embeddingů vzorových otázek}
+    chunk_vecs:    matice embeddingů chunků (pořadí jako chunks.json)
+    chunk_layers:  vrstva každého chunku
+
+    Vrací (seznam vrstev, matice centroidů [vrstvy x dim]).
+    """
+    centroids = {}
+    if chunk_vecs is not None and len(chunk_layers):
+        centroids = chunk_centroids(chunk_vecs, chunk_layers)
+
+    return combine_centroids(question_vecs, centroids)
+
+
+# ---------- CLASSIFY ----------
+def classify(q_vec, layers, centroids, margin=MARGIN) -> list[str]:
+    """
+    q_vec: normalizovaný embedding otázky (1D).
+    """
+    scores = centroids @ np.asarray(q_vec, dtype="float32").ravel()
+    order = np.argsort(-scores)
+
+    best = order[0]
+    result = [layers[best]]
+
+    if len(order) > 1 and scores[best] - scores[order[1]] < margin:
+        result.append(layers[order[1]])
+
+    return result
+
+
+# ---------- LEGACY ----------
+def classify_rules(question: str) -> list[str]:
+    """
+    Původní substring pravidla – jen pro porovnání v bench_classifier.py.
+    """
+    q = question.lower()
+
+    if any(x in q for x in [
+        "pozorováno",
+        "zaznamenáno",
+        "případy",
+        "události"
+    ]):
+        return ["raw", "synth"]
+
+    if any(x in q for x in [
+        "jak",
+        "proč",
+        "vzorce"
+    ]):
+        return ["synth", "meta"]
+
+    if any(x in q for x in [
+        "nevíme",
+        "zkreslení",
+        "limity"
+    ]):
+        return ["meta", "synth"]
+
+    return ["synth"]
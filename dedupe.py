@@ -0,0 +1,172 @@
+# dedupe.py
+#
+# Sloučení téměř stejných chunků při buildu indexu.
+#
+# Kandidáti:
+#   MinHash nad znakovými 5-gramy (po fold()) + LSH pásma
+#   a k tomu páry s velmi vysokou kosinovou podobností embeddingů
+# Duplicita:
+#   (Jaccard ≥ JACCARD_MIN a kosinus ≥ COSINE_MIN) nebo kosinus ≥ COSINE_STRICT
+#
+# Slučuje se jen v rámci jedné vrstvy (RAW/SYNTH/META se nemíchají).
+# Reprezentant = nejdelší text clusteru, „sources“ = všechny zdroje.
+
+import zlib
+
+import numpy as np
+
+import lexical
+
+
+# ---------- CONFIG ----------
+SHINGLE = 5
+
+NUM_PERM = 64
+BANDS = 16                 # NUM_PERM / BANDS řádků na pásmo
+
+JACCARD_MIN = 0.5
+COSINE_MIN = 0.90
+COSINE_STRICT = 0.97
+
+SEED = 13
+
+_PRIME = (1 << 31) - 1
+
+_rng = np.random.default_rng(SEED)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+
+# ---------- MINHASH ----------
+def shingles(text: str) -> set[int]:
+
+    text = " ".join(lexical.fold(text).split())
+
+    if len(text) <= SHINGLE:
+        return {zlib.crc32(text.encode("utf-8"))}
+
+    return {
+        zlib.crc32(text[i:i + SHINGLE].encode("utf-8"))
+        for i in range(len(text) - SHINGLE + 1)
+    }
+
+
+def minhash(text: str):
+
+    x = np.fromiter(shingles(text), dtype=np.uint64) % _PRIME
+
+    return ((np.outer(x, _A) + _B) % _PRIME).min(axis=0)
+
+
+def jaccard(sig_a, sig_b) -> float:
+    return float((sig_a == sig_b).mean())
+
+
+def _lsh_pairs(signatures, groups) -> set[tuple[int, int]]:
+
+    rows = NUM_PERM // BANDS
+    pairs = set()
+
+    for band in range(BANDS):
+
+        buckets = {}
+
+        for i, sig in enumerate(signatures):
+            key = (groups[i], sig[band * rows:(band + 1) * rows].tobytes())
+            buckets.setdefault(key, []).append(i)
+
+        for ids in buckets.values():
+            for n, i in enumerate(ids):
+                for j in ids[n + 1:]:
+                    pairs.add((i, j))
+
+    return pairs
+
+
+def _cosine_pairs(vectors, groups, threshold, block=1024) -> set[tuple[int, int]]:
+    """
+    Páry nad prahem (vektory normalizované → kosinus = skalární součin).
+    """
+    pairs = set()
+    n = len(vectors)
+
+    for start in range(0, n, block):
+        sims = vectors[start:start + block] @ vectors.T
+
+        for r, j in zip(*np.nonzero(sims >= threshold)):
+            i = start + int(r)
+            j = int(j)
+            if i < j and groups[i] == groups[j]:
+                pairs.add((i, j))
+
+    return pairs
+
+
+# ---------- CLUSTERS ----------
+def find_clusters(chunks: list[dict], vectors) -> list[list[int]]:
+    """
+    Clustery téměř stejných chunků (jen clustery s ≥ 2 prvky).
+    """
+    vectors = np.asarray(vectors, dtype="float32")
+    groups = [c.get("layer") for c in chunks]
+
+    signatures = [minhash(c["text"]) for c in chunks]
+
+    candidates = _lsh_pairs(signatures, groups) | _cosine_pairs(vectors, groups, COSINE_MIN)
+
+    parent = list(range(len(chunks)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in candidates:
+
+        if groups[i] != groups[j]:
+            continue
+
+        cos = float(vectors[i] @ vectors[j])
+
+        if cos >= COSINE_STRICT or (
+            cos >= COSINE_MIN and jaccard(signatures[i], signatures[j]) >= JACCARD_MIN
+        ):
+            parent[root(i)] = root(j)
+
+    clusters = {}
+    for i in range(len(chunks)):
+        clusters.setdefault(root(i), []).append(i)
+
+    return [sorted(ids) for ids in clusters.values() if len(ids) > 1]
+
+
+def collapse(chunks: list[dict], vectors):
+    """
+    Vrací (chunky, vektory, clustery) – z každého clusteru zůstane
+    reprezentant se sloučenými zdroji, pořadí ostatních chunků se zachová.
+    """
+    clusters = find_clusters(chunks, vectors)
+
+    drop = set()
+    merged = {}
+
+    for ids in clusters:
+        keep = max(ids, key=lambda i: (len(chunks[i]["text"]), -i))
+
+        sources = []
+        for i in ids:
+            for s in chunks[i].get("sources", [chunks[i]["source"]]):
+                if s not in sources:
+                    sources.append(s)
+
+        merged[keep] = {**chunks[keep], "sources": sources}
+        drop.update(i for i in ids if i != keep)
+
+    kept = [i for i in range(len(chunks)) if i not in drop]
+
+    return (
+        [merged.get(i, chunks[i]) for i in kept],
+        np.asarray(vectors)[kept],
+        clusters,
+    )
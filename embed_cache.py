@@ -0,0 +1,353 @@
+# embed_cache.py
+#
+# Trvalá cache embeddingů: klíč = (model, sha1 normalizovaného textu),
+# hodnota = normalizovaný float32 vektor.
+#
+# cache/embeddings/<model>/
+#   keys.bin      16 B digest na řádek (append-only)
+#   vectors.f32   float32 × dim na řádek, čte se přes np.memmap
+#   meta.json     {"model", "dim"}
+#
+# Korpus (chunky z build_index.py, vzorové otázky klasifikátoru) roste jen
+# s indexem. Dotazy uživatelů jdou do QuestionCache – stejný formát, ale
+# ve dvou generacích s pevným stropem řádků:
+#
+# cache/questions/<model>/gen-<n>/   aktuální generace (zápis)
+# cache/questions/<model>/gen-<n-1>/ předchozí (jen čtení, zásah → přepis do aktuální)
+#
+# Plná aktuální generace → založí se gen-<n+1> a gen-<n-1> se smaže.
+# Na disku i v _rows je tak nejvýš ~max_rows dotazů, naposledy použité
+# přežívají (LRU po generacích) a cache přežije restart.
+#
+# Zápis drží flock, takže build_index.py i více workerů můžou sdílet
+# jednu cache. Řádek je platný, až když existuje jeho klíč (vektor se
+# zapisuje první), takže pád uprostřed zápisu nic nerozbije.
+
+import os
+import re
+import json
+import fcntl
+import shutil
+import hashlib
+import threading
+import unicodedata
+
+import numpy as np
+
+
+# ---------- CONFIG ----------
+CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join("cache", "embeddings"))
+QUESTION_CACHE_DIR = os.getenv("EMBED_QUESTION_CACHE_DIR", os.path.join("cache", "questions"))
+
+# strop dotazů na disku (obě generace dohromady)
+QUESTION_CACHE_ROWS = int(os.getenv("EMBED_QUESTION_CACHE_ROWS", "50000"))
+
+KEY_BYTES = 16
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).digest()[:KEY_BYTES]
+
+
+def _model_dir(folder: str, model_id: str) -> str:
+    return os.path.join(folder, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id))
+
+
+class EmbeddingCache:
+
+    def __init__(self, model_id: str, folder: str = CACHE_DIR, path: str = None):
+
+        self.model_id = model_id
+        self.dir = path or _model_dir(folder, model_id)
+
+        os.makedirs(self.dir, exist_ok=True)
+
+        self.key_path = os.path.join(self.dir, "keys.bin")
+        self.vec_path = os.path.join(self.dir, "vectors.f32")
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self.lock_path = os.path.join(self.dir, ".lock")
+
+        self.dim = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+
+        self._rows = {}             # digest → řádek
+        self._keys_read = 0         # kolik bajtů keys.bin už je v _rows
+        self._mmap = None
+        self._mmap_rows = 0
+
+        self._lock = threading.Lock()
+
+        self.stats = {"hits": 0, "misses": 0}
+
+        self._refresh()
+
+    # ----- read -----
+    def _refresh(self):
+        """
+        Dočti klíče, které mezitím připsal jiný proces.
+        """
+        if not os.path.exists(self.key_path):
+            return
+
+        size = os.path.getsize(self.key_path)
+        size -= size % KEY_BYTES
+
+        if size <= self._keys_read:
+            return
+
+        with open(self.key_path, "rb") as f:
+            f.seek(self._keys_read)
+            data = f.read(size - self._keys_read)
+
+        row = self._keys_read // KEY_BYTES
+
+        for i in range(0, len(data), KEY_BYTES):
+            self._rows.setdefault(data[i:i + KEY_BYTES], row)
+            row += 1
+
+        self._keys_read = size
+
+    def _vectors(self):
+
+        n = self._keys_read // KEY_BYTES
+
+        if n and self._mmap_rows != n:
+            self._mmap = np.memmap(self.vec_path, dtype="float32", mode="r", shape=(n, self.dim))
+            self._mmap_rows = n
+
+        return self._mmap
+
+    def __len__(self):
+        return len(self._rows)
+
+    # ----- write -----
+    def _append(self, keys: list[bytes], vectors):
+
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            try:
+                self._refresh()
+
+                fresh = [
+                    (k, v) for k, v in zip(keys, vectors)
+                    if k not in self._rows
+                ]
+                # stejný text dvakrát v jedné dávce
+                fresh = list({k: v for k, v in fresh}.items())
+
+                if not fresh:
+                    return
+
+                if self.dim is None:
+                    self.dim = int(vectors.shape[1])
+                    with open(self.meta_path, "w", encoding="utf-8") as f:
+                        json.dump({"model": self.model_id, "dim": self.dim}, f)
+
+                n = self._keys_read // KEY_BYTES
+
+                with open(self.vec_path, "ab") as f:
+                    # zbytek po přerušeném zápisu bez klíče → zahodit
+                    f.truncate(n * self.dim * 4)
+                    f.write(np.asarray([v for _, v in fresh], dtype="float32").tobytes())
+
+                with open(self.key_path, "ab") as f:
+                    f.write(b"".join(k for k, _ in fresh))
+
+                self._refresh()
+
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    # ----- API -----
+    def lookup(self, keys: list[bytes]) -> dict:
+        """
+        → {pozice v keys: vektor} pro klíče, které cache zná.
+        """
+        found = {}
+
+        with self._lock:
+            self._refresh()
+            vectors = self._vectors()
+
+            for i, k in enumerate(keys):
+                row = self._rows.get(k)
+                if row is not None:
+                    found[i] = np.array(vectors[row])
+
+        return found
+
+    def store(self, keys: list[bytes], vectors):
+
+        with self._lock:
+            self._append(keys, np.asarray(vectors, dtype="float32"))
+
+    def encode(self, encode_fn, texts: list[str]):
+        """
+        encode_fn(list[str]) → float32 matice; volá se jen pro chybějící texty.
+        """
+        return _encode(self, encode_fn, texts)
+
+
+def _encode(cache, encode_fn, texts: list[str]):
+
+    if not texts:
+        return np.empty((0, cache.dim or 0), dtype="float32")
+
+    keys = [text_key(t) for t in texts]
+    found = cache.lookup(keys)
+    missing = [i for i in range(len(texts)) if i not in found]
+
+    cache.stats["hits"] += len(found)
+    cache.stats["misses"] += len(missing)
+
+    new = None
+    if missing:
+        new = np.asarray(encode_fn([texts[i] for i in missing]), dtype="float32")
+        cache.store([keys[i] for i in missing], new)
+
+    dim = new.shape[1] if new is not None else next(iter(found.values())).shape[0]
+    out = np.empty((len(texts), dim), dtype="float32")
+
+    for i, v in found.items():
+        out[i] = v
+
+    if missing:
+        out[missing] = new
+
+    return out
+
+
+# ---------- QUESTIONS ----------
+def _lookup(cache: EmbeddingCache, keys: list[bytes]) -> dict:
+
+    try:
+        return cache.lookup(keys)
+    except OSError:
+        # generaci mezitím smazala rotace v jiném procesu → jako prázdná
+        return {}
+
+
+class QuestionCache:
+    """
+    Ohraničená trvalá cache dotazů: dvě generace EmbeddingCache,
+    každá nejvýš max_rows / 2 řádků.
+    """
+
+    def __init__(self, model_id: str, folder: str = QUESTION_CACHE_DIR,
+                 max_rows: int = QUESTION_CACHE_ROWS):
+
+        self.model_id = model_id
+        self.dir = _model_dir(folder, model_id)
+        self.max_rows = max(2, max_rows)
+
+        os.makedirs(self.dir, exist_ok=True)
+
+        self.lock_path = os.path.join(self.dir, ".lock")
+
+        self.generation = None
+        self.current = None
+        self.previous = None
+
+        self._lock = threading.Lock()
+
+        self.stats = {"hits": 0, "misses": 0, "promoted": 0, "rotations": 0}
+
+        self._sync()
+
+    @property
+    def dim(self):
+        return self.current.dim
+
+    def _gen_path(self, n: int) -> str:
+        return os.path.join(self.dir, f"gen-{n}")
+
+    def _latest(self) -> int:
+
+        gens = [
+            int(name[4:]) for name in os.listdir(self.dir)
+            if name.startswith("gen-") and name[4:].isdigit()
+        ]
+
+        return max(gens, default=0)
+
+    def _sync(self):
+        """
+        Jiný proces mohl mezitím založit novou generaci → přepnout.
+        """
+        n = self._latest()
+
+        if n == self.generation:
+            return
+
+        current = EmbeddingCache(self.model_id, path=self._gen_path(n))
+        previous = None
+
+        if n > 0 and os.path.isdir(self._gen_path(n - 1)):
+            previous = EmbeddingCache(self.model_id, path=self._gen_path(n - 1))
+
+        self.generation, self.current, self.previous = n, current, previous
+
+    def _rotate(self):
+
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            try:
+                n = self._latest()
+
+                # rotaci už udělal jiný proces
+                if n == self.generation and len(self.current) >= self.max_rows // 2:
+                    os.makedirs(self._gen_path(n + 1), exist_ok=True)
+
+                    # memmap v ostatních procesech zůstane platný i po smazání
+                    if os.path.isdir(self._gen_path(n - 1)):
+                        shutil.rmtree(self._gen_path(n - 1), ignore_errors=True)
+
+                    self.stats["rotations"] += 1
+
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        self._sync()
+
+    def __len__(self):
+        return len(self.current) + (len(self.previous) if self.previous else 0)
+
+    def lookup(self, keys: list[bytes]) -> dict:
+
+        with self._lock:
+            self._sync()
+            current, previous = self.current, self.previous
+
+        found = _lookup(current, keys)
+
+        if previous is not None and len(found) < len(keys):
+            rest = [i for i in range(len(keys)) if i not in found]
+            old = _lookup(previous, [keys[i] for i in rest])
+
+            if old:
+                # použitý dotaz přežije další rotaci
+                promoted = {rest[j]: v for j, v in old.items()}
+                current.store([keys[i] for i in promoted], list(promoted.values()))
+                self.stats["promoted"] += len(promoted)
+                found.update(promoted)
+
+        return found
+
+    def store(self, keys: list[bytes], vectors):
+
+        self.current.store(keys, vectors)
+
+        if len(self.current) >= self.max_rows // 2:
+            with self._lock:
+                self._rotate()
+
+    def encode(self, encode_fn, texts: list[str]):
+        return _encode(self, encode_fn, texts)
@@ -0,0 +1,291 @@
+# eval_retrieval.py
+#
+# Kvalita vs. latence retrievalu pro různé embedding modely.
+#
+#   python eval_retrieval.py
+#   python eval_retrieval.py --models all-MiniLM-L6-v2 paraphrase-multilingual-MiniLM-L12-v2
+#
+# Každý model běží ve vlastním procesu (čisté měření RSS a času načtení).
+# Hodnotí se jen lokálně dostupné modely (HF_HUB_OFFLINE), ostatní se přeskočí.
+#
+# Metriky:
+#   recall@k  – podíl očekávaných chunků (eval/retrieval_labels.json) v top-k
+#   MRR       – 1 / pořadí prvního očekávaného chunku
+#   fallback  – podíl otázek (ALLOWED_QUESTIONS + TOPICS), kde po filtru vrstev
+#               nezbude evidence → ask() by volal run_reasoner
+
+import os
+import re
+import ast
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+
+# ---------- CONFIG ----------
+LABELS_PATH = os.path.join("eval", "retrieval_labels.json")
+RESULTS_LOG = os.path.join("logs", "eval_retrieval.jsonl")
+
+CHUNKS_PATH = os.path.join("index", "chunks.json")
+
+DEFAULT_MODELS = [
+    "all-MiniLM-L6-v2",
+    "paraphrase-multilingual-MiniLM-L12-v2",
+    "paraphrase-multilingual-mpnet-base-v2",
+    "intfloat/multilingual-e5-small",
+    "sentence-transformers/LaBSE",
+]
+
+# e5 modely chtějí prefixy (dotaz, dokument)
+MODEL_PREFIXES = {
+    "intfloat/multilingual-e5-small": ("query: ", "passage: "),
+    "intfloat/multilingual-e5-base": ("query: ", "passage: "),
+}
+
+
+# ---------- HELPERS ----------
+def module_constants(path: str, *names) -> dict:
+    """
+    Konstanty z query.py / retrieval.py bez importu
+    (import by načetl model, index i Gemini).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    found = {}
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1:
+            target = node.targets[0]
+            if isinstance(target, ast.Name) and target.id in names:
+                found[target.id] = ast.literal_eval(node.value)
+
+    return found
+
+
+def topic_questions(topics: str) -> list[str]:
+    return re.findall(r"^\d+\.\s+(.+)$", topics, flags=re.MULTILINE)
+
+
+def rss_mb() -> float:
+
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+# ---------- WORKER ----------
+def evaluate_model(model_name: str) -> dict:
+
+    import faiss
+
+    import classifier
+    import lexical
+    from ux.allowed_questions import ALLOWED_QUESTIONS
+
+    const = {
+        **module_constants("query.py", "TOP_K", "TOPICS"),
+        **module_constants("retrieval.py", "FAISS_K", "LEXICAL_K"),
+    }
+    top_k, faiss_k = const["TOP_K"], const["FAISS_K"]
+
+    with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+
+    with open(LABELS_PATH, "r", encoding="utf-8") as f:
+        labels = json.load(f)
+
+    text_to_id = {c["text"]: i for i, c in enumerate(chunks)}
+
+    q_prefix, d_prefix = MODEL_PREFIXES.get(model_name, ("", ""))
+
+    rss_start = rss_mb()
+
+    # --- load ---
+    t0 = time.perf_counter()
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name)
+    load_s = time.perf_counter() - t0
+
+    rss_loaded = rss_mb()
+
+    # --- corpus ---
+    t0 = time.perf_counter()
+    chunk_vecs = model.encode(
+        [d_prefix + c["text"] for c in chunks],
+        normalize_embeddings=True
+    ).astype("float32")
+    corpus_s = time.perf_counter() - t0
+
+    index = faiss.IndexFlatL2(chunk_vecs.shape[1])
+    index.add(chunk_vecs)
+
+    bm25 = lexical.BM25Index.build([c["text"] for c in chunks])
+
+    question_vecs = {
+        layer: model.encode([q_prefix + q for q in qs], normalize_embeddings=True)
+        for layer, qs in ALLOWED_QUESTIONS.items()
+    }
+    layers, centroids = classifier.build_centroids(
+        question_vecs, chunk_vecs, [c["layer"] for c in chunks]
+    )
+
+    # --- queries (po jednom, jako v ask()) ---
+    questions = [l["question"] for l in labels] + topic_questions(const["TOPICS"])
+
+    encode_ms = []
+    q_vecs = []
+
+    for q in questions:
+        t0 = time.perf_counter()
+        v = model.encode([q_prefix + q], normalize_embeddings=True).astype("float32")
+        encode_ms.append((time.perf_counter() - t0) * 1000)
+        q_vecs.append(v)
+
+    def ranked(i, hybrid):
+        _, idx = index.search(q_vecs[i], faiss_k)
+        dense = [int(x) for x in idx[0] if x >= 0]
+        if not hybrid:
+            return dense
+        lex = [d for d, _ in bm25.search(questions[i], const["LEXICAL_K"])]
+        return lexical.rrf(dense, lex)[:faiss_k]
+
+    result = {
+        "model": model_name,
+        "dim": int(chunk_vecs.shape[1]),
+        "load_s": round(load_s, 2),
+        "corpus_s": round(corpus_s, 2),
+        "encode_ms_p50": round(percentile(encode_ms, 0.5), 1),
+        "encode_ms_p95": round(percentile(encode_ms, 0.95), 1),
+        "rss_mb": round(rss_loaded, 1),
+        "rss_model_mb": round(rss_loaded - rss_start, 1),
+    }
+
+    missing = 0
+
+    for mode, hybrid in (("dense", False), ("hybrid", True)):
+
+        recall_top, recall_faiss, rr = [], [], []
+
+        for i, label in enumerate(labels):
+            expected = {text_to_id[t] for t in label["chunks"] if t in text_to_id}
+            if not expected:
+                missing += 1
+                continue
+
+            ranking = ranked(i, hybrid)
+
+            recall_top.append(len(expected & set(ranking[:top_k])) / len(expected))
+            recall_faiss.append(len(expected & set(ranking)) / len(expected))
+
+            first = next((r for r, d in enumerate(ranking) if d in expected), None)
+            rr.append(0.0 if first is None else 1.0 / (first + 1))
+
+        n = max(1, len(rr))
+        result[f"{mode}_recall@{top_k}"] = round(sum(recall_top) / n, 3)
+        result[f"{mode}_recall@{faiss_k}"] = round(sum(recall_faiss) / n, 3)
+        result[f"{mode}_mrr"] = round(sum(rr) / n, 3)
+
+    fallbacks = 0
+
+    for i in range(len(questions)):
+        allowed = classifier.classify(q_vecs[i][0], layers, centroids)
+        if not any(chunks[d]["layer"] in allowed for d in ranked(i, True)):
+            fallbacks += 1
+
+    result["fallback_rate"] = round(fallbacks / len(questions), 3)
+    result["labels_missing"] = missing // 2
+
+    return result
+
+
+# ---------- DRIVER ----------
+def run_isolated(model_name: str):
+
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", model_name],
+        capture_output=True,
+        text=True
+    )
+
+    if proc.returncode != 0:
+        last = (proc.stderr.strip().splitlines() or ["?"])[-1]
+        print(f"  ✗ {model_name}: {last}")
+        return None
+
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def print_table(rows):
+
+    if not rows:
+        print("Žádný model nebyl k dispozici.")
+        return
+
+    cols = [k for k in rows[0] if k != "model"]
+    width = max(len(r["model"]) for r in rows)
+
+    print()
+    print(f"| {'model':<{width}} | " + " | ".join(cols) + " |")
+    print(f"|{'-' * (width + 2)}|" + "|".join("-" * (len(c) + 2) for c in cols) + "|")
+
+    for r in rows:
+        print(
+            f"| {r['model']:<{width}} | "
+            + " | ".join(f"{r.get(c, ''):>{len(c)}}" for c in cols)
+            + " |"
+        )
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Evaluace retrievalu")
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(evaluate_model(args.worker)))
+        return
+
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    rows = []
+
+    print(f"▶ eval run {run_id}")
+
+    for name in args.models:
+        print(f"  … {name}")
+        r = run_isolated(name)
+        if r:
+            rows.append(r)
+
+    print_table(rows)
+
+    os.makedirs(os.path.dirname(RESULTS_LOG), exist_ok=True)
+
+    with open(RESULTS_LOG, "a", encoding="utf-8") as f:
+        for r in rows:
+            f.write(json.dumps({"run": run_id, **r}, ensure_ascii=False) + "\n")
+
+    print(f"\n▶ uloženo do {RESULTS_LOG}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# knowledge_bases.py
+#
+# Více korpusů v jednom botu (různé niky tvůrců, jazyky).
+#
+# knowledge_bases.json (KB_CONFIG):
+#   {
+#     "bases": {"gaming": "indexes/gaming", "en": "indexes/en"},
+#     "chats": {"123456789": "gaming"}
+#   }
+#
+# Výchozí báze = index/ (retrieval.default_kb nebo vzdálený retriever),
+# zůstává načtená napořád – lokální až od prvního dotazu, další báze ji
+# nenačítají. Ostatní se načtou až při prvním dotazu a drží se nejvýš
+# KB_MAX_RESIDENT z nich / KB_MAX_BYTES paměti – nejdéle nepoužitá se
+# uvolní. Embedding model sdílí všechny báze.
+#
+# Vzorové otázky klasifikátoru vrstev: <index>/questions.json
+# ({"raw": [...], "synth": [...], "meta": [...]}). Bez souboru má výchozí
+# báze ALLOWED_QUESTIONS, ostatní centroidy jen z vlastních chunků.
+#
+# Chat si bázi přepne příkazem /kb <název> (telegram_bot.py).
+
+import os
+import json
+import threading
+from collections import OrderedDict
+
+import memory
+
+
+# ---------- CONFIG ----------
+KB_CONFIG = os.getenv("KB_CONFIG", "knowledge_bases.json")
+
+KB_MAX_RESIDENT = int(os.getenv("KB_MAX_RESIDENT", "3"))
+KB_MAX_BYTES = int(os.getenv("KB_MAX_BYTES", str(256 * 1024 * 1024)))
+
+DEFAULT = "default"
+
+
+class UnknownKnowledgeBase(KeyError):
+    pass
+
+
+def load_config(path: str = KB_CONFIG) -> tuple[dict, dict]:
+    """
+    → (název → adresář indexu, chat_id → název)
+    """
+    if not os.path.exists(path):
+        return {}, {}
+
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    return config.get("bases", {}), {
+        str(chat): name for chat, name in config.get("chats", {}).items()
+    }
+
+
+def _load_local(name: str, index_dir: str):
+
+    import retrieval
+
+    return retrieval.KnowledgeBase(index_dir, name=name)
+
+
+# ---------- REGISTRY ----------
+class Registry:
+
+    def __init__(self, default, bases=None, chats=None, loader=_load_local,
+                 max_resident=KB_MAX_RESIDENT, max_bytes=KB_MAX_BYTES):
+
+        self.default = default
+        self.bases = dict(bases or {})
+        self.max_resident = max_resident
+        self.max_bytes = max_bytes
+
+        self._loader = loader
+        self._chats = dict(chats or {})
+        self._resident = OrderedDict()      # název → báze, LRU pořadí
+        self._loading = {}                  # název → Lock (jedno načtení naráz)
+        self._lock = threading.Lock()
+
+        self.stats = {"loads": 0, "evictions": 0}
+
+    def names(self) -> list[str]:
+        return [DEFAULT] + sorted(self.bases)
+
+    # ----- lookup -----
+    def get(self, name: str = None):
+
+        if not name or name == DEFAULT:
+            return self.default
+
+        if name not in self.bases:
+            raise UnknownKnowledgeBase(name)
+
+        with self._lock:
+            kb = self._resident.get(name)
+            if kb is not None:
+                self._resident.move_to_end(name)
+                return kb
+            loading = self._loading.setdefault(name, threading.Lock())
+
+        # načítání mimo hlavní zámek – ostatní báze mezitím odpovídají
+        with loading:
+
+            with self._lock:
+                kb = self._resident.get(name)
+            if kb is not None:
+                return kb
+
+            kb = self._loader(name, self.bases[name])
+
+            with self._lock:
+                self._resident[name] = kb
+                self.stats["loads"] += 1
+                self._evict(keep=name)
+
+        print(f"▶ KB {name}: {len(kb.chunks)} chunků, ~{_size(kb) / 2**20:.1f} MiB")
+
+        memory.check_budget(f"kb:{name}")
+
+        return kb
+
+    def resolve(self, chat_id=None, name: str = None):
+        """
+        → (název, báze): explicitní název, jinak volba chatu, jinak výchozí.
+        """
+        if not name:
+            name = self._chats.get(str(chat_id), DEFAULT) if chat_id is not None else DEFAULT
+
+            # báze mezitím zmizela z konfigurace → výchozí
+            if name != DEFAULT and name not in self.bases:
+                name = DEFAULT
+
+        return name, self.get(name)
+
+    def select(self, chat_id, name: str):
+
+        if name != DEFAULT and name not in self.bases:
+            raise UnknownKnowledgeBase(name)
+
+        with self._lock:
+            self._chats[str(chat_id)] = name
+
+    def selected(self, chat_id) -> str:
+        return self._chats.get(str(chat_id), DEFAULT)
+
+    # ----- eviction -----
+    def _evict(self, keep: str):
+
+        def over():
+            total = sum(_size(kb) for kb in self._resident.values())
+            return len(self._resident) > self.max_resident or total > self.max_bytes
+
+        # rozběhnuté dotazy drží referenci → báze zmizí až po nich
+        while over() and len(self._resident) > 1:
+            name = next(n for n in self._resident if n != keep)
+            self._resident.pop(name)
+            self.stats["evictions"] += 1
+            print(f"▶ KB {name} uvolněna (LRU)")
+
+    def snapshot(self) -> dict:
+
+        with self._lock:
+            return {
+                "resident": {
+                    name: round(_size(kb) / 2**20, 2)
+                    for name, kb in self._resident.items()
+                },
+                "available": self.names(),
+                **self.stats,
+            }
+
+
+def _size(kb) -> int:
+    return kb.memory_bytes() if hasattr(kb, "memory_bytes") else 0
+
+
+def create_registry(default) -> Registry:
+
+    bases, chats = load_config()
+
+    return Registry(default, bases, chats)
@@ -0,0 +1,128 @@
+# launcher.py
+#
+# retrieval_server.py a workery v jednom kontejneru. Každý typ procesu
+# z Procfile běží na platformě ve vlastním kontejneru – server na
+# 127.0.0.1 je dosažitelný jen z procesů spuštěných vedle něj.
+#
+#   python launcher.py telegram_bot.py api_server.py
+#
+# Procfile (bot + API nad jedním modelem a indexem):
+#   web: python launcher.py api_server.py telegram_bot.py
+#
+# Bot běží jen v jednom kontejneru – dva procesy s jedním tokenem by si
+# přebíraly getUpdates. Webový typ proto škálovat jen na 1.
+#
+# Napřed spustí server a počká na /health, pak workery s RETRIEVAL_URL.
+# Skončí-li kterýkoli proces, ukončí i ostatní – platforma pak restartuje
+# celý kontejner.
+
+import os
+import sys
+import time
+import json
+import signal
+import subprocess
+import http.client
+
+
+# ---------- CONFIG ----------
+RETRIEVAL_HOST = "127.0.0.1"
+RETRIEVAL_PORT = int(os.getenv("RETRIEVAL_PORT", "8765"))
+
+# načtení indexu (a modelu při studené cache embeddingů)
+READY_TIMEOUT = float(os.getenv("LAUNCHER_READY_TIMEOUT", "180"))
+
+STOP_TIMEOUT = 10.0
+
+
+def _healthy() -> bool:
+
+    conn = http.client.HTTPConnection(RETRIEVAL_HOST, RETRIEVAL_PORT, timeout=5)
+
+    try:
+        conn.request("GET", "/health")
+        response = conn.getresponse()
+        return response.status == 200 and "chunks" in json.loads(response.read())
+    except (OSError, http.client.HTTPException, ValueError):
+        return False
+    finally:
+        conn.close()
+
+
+def _wait_ready(server) -> bool:
+
+    deadline = time.monotonic() + READY_TIMEOUT
+
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            return False
+        if _healthy():
+            return True
+        time.sleep(0.5)
+
+    return False
+
+
+def _stop(processes):
+
+    for p in processes:
+        if p.poll() is None:
+            p.terminate()
+
+    deadline = time.monotonic() + STOP_TIMEOUT
+
+    for p in processes:
+        try:
+            p.wait(max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+
+def main(argv=None):
+
+    scripts = sys.argv[1:] if argv is None else argv
+
+    if not scripts:
+        raise SystemExit("použití: python launcher.py <skript.py> [<skript.py> …]")
+
+    env = {
+        **os.environ,
+        "RETRIEVAL_HOST": RETRIEVAL_HOST,
+        "RETRIEVAL_PORT": str(RETRIEVAL_PORT),
+    }
+
+    server = subprocess.Popen([sys.executable, "retrieval_server.py"], env=env)
+    processes = [server]
+
+    # platforma posílá SIGTERM při restartu / nasazení → předat dál
+    def on_signal(signum, frame):
+        _stop(processes)
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+    if not _wait_ready(server):
+        _stop(processes)
+        raise SystemExit(f"retrieval server nenaběhl do {READY_TIMEOUT:g}s")
+
+    print(f"▶ Retrieval server připraven, spouštím {', '.join(scripts)}")
+
+    env["RETRIEVAL_URL"] = f"http://{RETRIEVAL_HOST}:{RETRIEVAL_PORT}"
+
+    for script in scripts:
+        processes.append(subprocess.Popen([sys.executable, script], env=env))
+
+    while True:
+        for p in processes:
+            code = p.poll()
+            if code is not None:
+                print(f"▶ {p.args[-1]} skončil ({code}), ukončuji ostatní")
+                _stop(processes)
+                raise SystemExit(code or 1)
+
+        time.sleep(1.0)
+
+
+if __name__ == "__main__":
+    main()
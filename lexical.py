@@ -0,0 +1,159 @@
+# lexical.py
+#
+# In-process BM25 nad chunky – doplněk k FAISS pro přesné termíny
+# („monetizace“, „content houses“, „Vine“), které anglický embedding
+# model v češtině zachytí špatně.
+
+import math
+import json
+import unicodedata
+from collections import Counter
+
+
+# ---------- CONFIG ----------
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+MIN_STEM = 3
+
+# bez diakritiky – porovnává se až po fold()
+STOPWORDS = {
+    "a", "aby", "ale", "ani", "az", "bez", "by", "byl", "byla", "byli",
+    "bylo", "byly", "co", "do", "i", "jak", "jake", "jaka", "jaky", "je",
+    "jeho", "jen", "ji", "jsem", "jsou", "k", "kde", "kdo", "kdy", "ke",
+    "ktera", "ktere", "ktery", "mam", "me", "mi", "mne", "mu", "na", "nad",
+    "nebo", "neco", "o", "od", "po", "pod", "pro", "proc", "pri", "s",
+    "se", "si", "so", "ta", "tak", "te", "tem", "to", "tu", "u", "uz", "v",
+    "ve", "z", "za", "ze", "zda",
+}
+
+# nejdelší napřed; bez diakritiky
+SUFFIXES = sorted([
+    "ovani", "ovat", "ovy", "ove", "oveho", "ovych", "ovym", "ovymi",
+    "ani", "eni", "ost", "osti", "ostmi",
+    "eho", "emu", "ych", "ymi", "ami", "emi", "ach", "ich", "ech",
+    "ou", "em", "um", "im", "ym", "es", "ho",
+    "a", "e", "i", "o", "u", "y",
+], key=len, reverse=True)
+
+
+# ---------- TEXT ----------
+def fold(text: str) -> str:
+    """
+    Malá písmena + odstranění diakritiky („Proč“ → „proc“).
+    """
+    text = unicodedata.normalize("NFD", text.lower())
+    return "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
+
+
+def stem(word: str) -> str:
+    """
+    Lehký český stemmer: odřízne nejdelší koncovku, kmen ≥ MIN_STEM.
+    """
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+
+    words = "".join(
+        ch if ch.isalnum() else " "
+        for ch in fold(text)
+    ).split()
+
+    return [stem(w) for w in words if w not in STOPWORDS]
+
+
+# ---------- INDEX ----------
+class BM25Index:
+
+    def __init__(self, postings: dict, doc_len: list, avg_len: float):
+        # postings: term → {doc_id: tf}
+        self.postings = postings
+        self.doc_len = doc_len
+        self.avg_len = avg_len or 1.0
+        self.n_docs = len(doc_len)
+
+    @classmethod
+    def build(cls, texts):
+
+        postings = {}
+        doc_len = []
+
+        for doc_id, text in enumerate(texts):
+            terms = tokenize(text)
+            doc_len.append(len(terms))
+
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, {})[doc_id] = tf
+
+        avg_len = sum(doc_len) / len(doc_len) if doc_len else 0.0
+
+        return cls(postings, doc_len, avg_len)
+
+    def _idf(self, df: int) -> float:
+        return math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 8) -> list[tuple[int, float]]:
+
+        scores = {}
+
+        for term in set(tokenize(query)):
+
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+
+            idf = self._idf(len(docs))
+
+            for doc_id, tf in docs.items():
+                norm = BM25_K1 * (
+                    1 - BM25_B + BM25_B * self.doc_len[doc_id] / self.avg_len
+                )
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda x: -x[1])[:k]
+
+    # ----- persist -----
+    def save(self, path: str):
+
+        data = {
+            "postings": self.postings,
+            "doc_len": self.doc_len,
+            "avg_len": self.avg_len,
+        }
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str):
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        postings = {
+            term: {int(d): tf for d, tf in docs.items()}
+            for term, docs in data["postings"].items()
+        }
+
+        return cls(postings, data["doc_len"], data["avg_len"])
+
+
+# ---------- FUSION ----------
+RRF_K = 60
+
+
+def rrf(*rankings, k: int = RRF_K) -> list[int]:
+    """
+    Reciprocal rank fusion: každé pořadí přispívá 1 / (k + rank).
+    """
+    scores = {}
+
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+
+    return sorted(scores, key=lambda d: -scores[d])
@@ -0,0 +1,287 @@
+# llm.py
+#
+# Odolné volání Gemini: deadline na každé volání, circuit breaker,
+# volitelné hedged requesty (druhý pokus po překročení percentilu latence)
+# a průchod plánovačem RPM/TPM (scheduler.py).
+
+import os
+import re
+import time
+import threading
+from collections import deque
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    FIRST_COMPLETED,
+    wait,
+)
+
+from scheduler import scheduler, is_rate_limited, QueueTimeout
+
+
+# ---------- CONFIG ----------
+TIMEOUTS = {
+    "grounded": float(os.getenv("LLM_TIMEOUT_GROUNDED", "25")),
+    "reasoner": float(os.getenv("LLM_TIMEOUT_REASONER", "60")),
+}
+
+BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+HEDGE_ENABLED = os.getenv("LLM_HEDGE", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = 20
+
+MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "16"))
+
+RATE_LIMIT_RETRIES = 2
+
+
+# ---------- ERRORS ----------
+class LLMUnavailable(Exception):
+    """Upstream teď neodpoví – volající má vrátit degradovanou odpověď."""
+
+
+class CircuitOpen(LLMUnavailable):
+    pass
+
+
+class LLMTimeout(LLMUnavailable):
+    pass
+
+
+class LLMServerError(LLMUnavailable):
+    """5xx od Gemini – druhé volání (reasoner) by dopadlo stejně."""
+
+
+_SERVER_STATUSES = ("INTERNAL", "UNAVAILABLE", "DEADLINE_EXCEEDED")
+
+
+def is_server_error(error: Exception) -> bool:
+
+    code = getattr(error, "code", None)
+
+    if isinstance(code, int):
+        return 500 <= code < 600
+
+    text = str(error)
+
+    return bool(re.match(r"\s*5\d\d\b", text)) or any(s in text for s in _SERVER_STATUSES)
+
+
+# ---------- CIRCUIT BREAKER ----------
+class CircuitBreaker:
+    """
+    closed    → volání prochází, počítají se chyby v řadě
+    open      → po BREAKER_THRESHOLD chybách; vše hned končí CircuitOpen
+    half-open → po BREAKER_COOLDOWN projde jedno zkušební volání
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """
+        → True, pokud je toto volání zkušební (half-open).
+        """
+        with self._lock:
+            state = self.state
+
+            if state == "closed":
+                return False
+
+            if state == "half-open" and not self.probing:
+                self.probing = True
+                return True
+
+            raise CircuitOpen("circuit breaker otevřen")
+
+    def release_probe(self):
+        """
+        Zkušební volání skončilo bez verdiktu (429, fronta) → další smí zkusit.
+        """
+        with self._lock:
+            self.probing = False
+
+    def success(self):
+
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def failure(self):
+
+        with self._lock:
+            self.failures += 1
+
+            if self.probing or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                print(f"LLM BREAKER OPEN ({self.failures} chyb)")
+
+            self.probing = False
+
+
+breaker = CircuitBreaker()
+
+
+# ---------- LATENCY ----------
+_latencies = {}
+_lat_lock = threading.Lock()
+
+
+def _observe(step: str, seconds: float):
+
+    with _lat_lock:
+        _latencies.setdefault(step, deque(maxlen=200)).append(seconds)
+
+
+def latency_percentile(step: str, p: float):
+
+    with _lat_lock:
+        samples = sorted(_latencies.get(step, ()))
+
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+
+    return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+
+# ---------- CALL ----------
+_executor = ThreadPoolExecutor(
+    max_workers=MAX_WORKERS,
+    thread_name_prefix="llm"
+)
+
+
+def call(fn, step: str = "grounded", timeout: float = None,
+         chat_id=None, tokens: int = 0):
+    """
+    Spustí fn() (typicky client.models.generate_content) s deadlinem.
+
+    Před voláním projde plánovačem (RPM/TPM, priorita, férová fronta).
+    Na 429 zpomalí plánovač a zkusí to znovu – 429 se nepočítá do breakeru.
+
+    Vlákno, které deadline nestihne, nelze zabít – doběhne na pozadí,
+    ale volající už na něj nečeká.
+    """
+    probe = breaker.before_call()
+
+    try:
+        return _call(fn, step, timeout, chat_id, tokens)
+
+    finally:
+        # po success()/failure() už je probing False – jinak by zůstal viset
+        if probe:
+            breaker.release_probe()
+
+
+def _call(fn, step, timeout, chat_id, tokens):
+
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+
+        try:
+            ticket = scheduler.acquire(chat_id, step, tokens)
+        except QueueTimeout as e:
+            raise LLMUnavailable(str(e)) from e
+
+        try:
+            result = _run(fn, step, timeout, tokens)
+
+        except Exception as e:
+
+            if is_rate_limited(e):
+                scheduler.throttle()
+                if attempt < RATE_LIMIT_RETRIES:
+                    continue
+                raise LLMUnavailable("kvóta Gemini vyčerpána") from e
+
+            breaker.failure()
+
+            if is_server_error(e):
+                raise LLMServerError(str(e)) from e
+            raise
+
+        breaker.success()
+        scheduler.relax()
+
+        usage = getattr(result, "usage_metadata", None)
+        scheduler.commit(ticket, getattr(usage, "total_token_count", None))
+
+        return result
+
+
+def _run(fn, step, timeout, tokens):
+
+    if timeout is None:
+        timeout = TIMEOUTS.get(step, TIMEOUTS["grounded"])
+
+    t0 = time.monotonic()
+    deadline = t0 + timeout
+
+    futures = [_executor.submit(fn)]
+
+    hedge_after = (
+        latency_percentile(step, HEDGE_PERCENTILE)
+        if HEDGE_ENABLED else None
+    )
+
+    error = None
+
+    while futures:
+
+        remaining = deadline - time.monotonic()
+
+        if remaining <= 0:
+            break
+
+        wait_for = remaining
+
+        if hedge_after is not None and len(futures) == 1:
+            wait_for = min(remaining, max(0.0, t0 + hedge_after - time.monotonic()))
+
+        done, _ = wait(futures, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+        for f in done:
+            futures.remove(f)
+
+            try:
+                result = f.result()
+            except Exception as e:
+                error = e
+                continue
+
+            for other in futures:
+                other.cancel()
+
+            _observe(step, time.monotonic() - t0)
+            return result
+
+        # hedge: první pokus je pomalejší než percentil → pošli druhý
+        if (
+            hedge_after is not None
+            and len(futures) == 1
+            and time.monotonic() - t0 >= hedge_after
+        ):
+            print(f"LLM HEDGE ({step}, > {hedge_after:.1f}s)")
+            scheduler.note_extra(tokens)
+            futures.append(_executor.submit(fn))
+            hedge_after = None
+
+    if error is not None and not futures:
+        raise error
+
+    _observe(step, timeout)
+    raise LLMTimeout(f"{step}: bez odpovědi do {timeout:g}s")
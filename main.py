@@ -1,9 +1,37 @@
 # main.py
+#
+#   python main.py                                   # interaktivně
+#   python main.py --batch otazky.jsonl --out odpovedi.jsonl
+#   python main.py --batch otazky.csv --out odpovedi.jsonl --concurrency 8 --rpm 30
+#   cat otazky.txt | python main.py --batch - --out odpovedi.jsonl
+#
+# Vstup: JSONL ({"question": ..., "id"?: ...}), CSV se sloupcem question
+# (a volitelně id), jinak jedna otázka na řádek. Bez id = "#<řádek>";
+# duplicitní id = chyba vstupu.
+#
+# Výstup: JSONL, řádek na otázku hned po dokončení. Opakované spuštění
+# se stejným --out přeskočí id, která už odpověď mají (pokračování po
+# přerušení); chybné a degradované řádky (výpadek Gemini) se zkusí znovu.
 
-from query import ask
+import memory  # první – LOW_MEMORY mění výchozí limity ostatních modulů
 
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from prefilter import TRANSIENT_PREFIXES
+
+
+# ---------- INTERACTIVE ----------
+def interactive():
+
+    from query import ask
 
-def main():
     print("UX / Epistemický BOT – napiš otázku (exit = konec)")
     print("──────────────────────────────────────────────")
 
@@ -19,5 +47,192 @@ def main():
         print(answer)
 
 
+# ---------- BATCH INPUT ----------
+def read_questions(path: str, fmt: str = None) -> list[dict]:
+
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            lines = f.read().splitlines()
+
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower()
+        fmt = {".jsonl": "jsonl", ".csv": "csv"}.get(ext, "txt")
+
+    if fmt == "jsonl":
+        rows = [json.loads(line) for line in lines if line.strip()]
+    elif fmt == "csv":
+        rows = list(csv.DictReader(lines))
+    else:
+        rows = [{"question": line} for line in lines if line.strip()]
+
+    items = []
+    seen = set()
+
+    for n, row in enumerate(rows, 1):
+        question = (row.get("question") or "").strip()
+        if not question:
+            continue
+
+        # bez id = pořadí řádku s předponou, ať se nepotká s explicitním "2"
+        explicit = row.get("id")
+        item_id = f"#{n}" if explicit in (None, "") else str(explicit)
+
+        if item_id in seen:
+            raise SystemExit(f"{path}: duplicitní id {item_id!r} (řádek {n})")
+
+        seen.add(item_id)
+        items.append({"id": item_id, "question": question})
+
+    return items
+
+
+def done_ids(out_path: str) -> set[str]:
+
+    done = set()
+
+    if not os.path.exists(out_path):
+        return done
+
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                # useknutý poslední řádek po přerušení
+                continue
+            if "answer" in row:
+                done.add(row["id"])
+
+    return done
+
+
+# ---------- BATCH RUN ----------
+def answer_one(ask, item: dict) -> dict:
+
+    import tracing
+
+    t0 = time.perf_counter()
+
+    try:
+        answer = ask(item["question"])
+    except Exception as e:
+        return {**item, "error": str(e), "s": round(time.perf_counter() - t0, 3)}
+
+    row = {**item, "answer": answer, "s": round(time.perf_counter() - t0, 3)}
+
+    trace = tracing.last_trace()
+    if trace is not None:
+        row["trace"] = trace["id"]
+        row["path"] = trace["path"]
+        row["llm_s"] = round(sum(c["s"] for c in trace["llm"]), 3)
+        row["models"] = [c["model"] for c in trace["llm"]]
+
+    # výpadek Gemini ask() nevyhodí, vrátí degradovaný text → jako chyba,
+    # ať ho pokračování zkusí znovu
+    if row.get("path") == "degraded" or answer.lstrip().startswith(TRANSIENT_PREFIXES):
+        row["error"] = "degraded"
+        row["degraded"] = row.pop("answer")
+
+    return row
+
+
+def run_batch(items: list[dict], out_path: str, concurrency: int):
+
+    done = done_ids(out_path)
+    todo = [item for item in items if item["id"] not in done]
+
+    print(f"▶ {len(items)} otázek, {len(done)} hotovo dřív, {len(todo)} ke zpracování")
+
+    if not todo:
+        return
+
+    # model, index a klient se načtou jednou, ne souběžně ve vláknech
+    from query import ask
+
+    print(memory.format_report())
+
+    try:
+        memory.check_startup()
+    except memory.MemoryBudgetExceeded as e:
+        raise SystemExit(f"MEMORY BUDGET: {e}")
+
+    folder = os.path.dirname(out_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    lock = threading.Lock()
+    times = []
+    failed = 0
+    t0 = time.perf_counter()
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+
+    try:
+        with open(out_path, "a", encoding="utf-8") as out:
+
+            futures = [executor.submit(answer_one, ask, item) for item in todo]
+
+            for n, future in enumerate(as_completed(futures), 1):
+                row = future.result()
+                row["ts"] = round(time.time(), 3)
+
+                with lock:
+                    out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                    out.flush()
+
+                if "error" in row:
+                    failed += 1
+                else:
+                    times.append(row["s"])
+
+                print(f"  {n}/{len(todo)}  {row['s']:>6.1f}s  {row.get('path') or row.get('error', '-')}")
+
+    except KeyboardInterrupt:
+        # rozběhnuté dotazy se zahodí, hotové řádky zůstanou ve výstupu
+        print("\n▶ přerušeno – pokračuj stejným příkazem")
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise SystemExit(130)
+
+    executor.shutdown()
+
+    times.sort()
+    wall = time.perf_counter() - t0
+
+    print(f"\n▶ {len(times)} odpovědí, {failed} chyb, {wall:.1f}s celkem")
+
+    if times:
+        p95 = times[min(len(times) - 1, int(0.95 * len(times)))]
+        print(f"  p50 {times[len(times) // 2]:.1f}s, p95 {p95:.1f}s")
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="UX / Epistemický BOT")
+    parser.add_argument("--batch", metavar="SOUBOR",
+                        help="otázky ze souboru (- = stdin)")
+    parser.add_argument("--format", choices=["jsonl", "csv", "txt"],
+                        help="formát vstupu (jinak podle přípony)")
+    parser.add_argument("--out", default=os.path.join("logs", "answers.jsonl"))
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=int,
+                        help="strop volání Gemini za minutu (jinak LLM_RPM)")
+
+    args = parser.parse_args(argv)
+
+    if not args.batch:
+        interactive()
+        return
+
+    # plánovač čte limit při importu query → nastavit předem
+    if args.rpm:
+        os.environ["LLM_RPM"] = str(args.rpm)
+
+    items = read_questions(args.batch, args.format)
+
+    run_batch(items, args.out, max(1, args.concurrency))
+
+
 if __name__ == "__main__":
     main()
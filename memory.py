@@ -0,0 +1,206 @@
+# memory.py
+#
+# Paměť procesu na malém dynu: kolik RSS přidala která komponenta,
+# volitelně tracemalloc a rozpočet, nad kterým worker nenastartuje.
+#
+#   MEMORY_BUDGET_MB=512          strop RSS (bez něj se jen měří)
+#   MEMORY_BUDGET_ACTION=refuse   překročení při startu = konec (jinak warn)
+#   MEMORY_TRACE=1                tracemalloc (top alokace v /stats)
+#   LOW_MEMORY=1                  úsporný profil (viz LOW_MEMORY_PROFILE)
+#
+# Import co nejdřív (první řádek vstupních skriptů) – profil nastavuje
+# výchozí env proměnné, které ostatní moduly čtou při importu.
+
+import os
+import time
+import resource
+import tracemalloc
+import threading
+from contextlib import contextmanager
+
+
+# ---------- CONFIG ----------
+LOW_MEMORY = os.getenv("LOW_MEMORY", "0") == "1"
+
+BUDGET_MB = float(os.getenv("MEMORY_BUDGET_MB", "0")) or None
+BUDGET_ACTION = os.getenv("MEMORY_BUDGET_ACTION", "warn")
+
+TRACE = os.getenv("MEMORY_TRACE", "0") == "1"
+TRACE_FRAMES = 5
+
+# odhad, kolik přidá načtení embedding modelu (torch + váhy all-MiniLM-L6-v2)
+EXPECTED_MODEL_MB = float(os.getenv("MEMORY_EXPECTED_MODEL_MB", "800"))
+
+# úsporný profil = jiné výchozí hodnoty; explicitní env proměnná má přednost
+LOW_MEMORY_PROFILE = {
+    "FAISS_MMAP": "1",                          # flat / SQ index přes mmap
+    "EMBED_LRU_SIZE": "64",                     # embeddingy otázek v RAM
+    "EMBED_QUESTION_CACHE_ROWS": "5000",        # … a na disku (klíče v RAM)
+    "SESSION_MAX_BYTES": str(256 * 1024),
+    "KB_MAX_RESIDENT": "1",
+    "KB_MAX_BYTES": str(32 * 1024 * 1024),
+    "LLM_MAX_WORKERS": "4",
+    "API_WORKERS": "8",
+    "RETRIEVAL_BATCH_MAX": "8",
+}
+
+if LOW_MEMORY:
+    for key, value in LOW_MEMORY_PROFILE.items():
+        os.environ.setdefault(key, value)
+
+if TRACE:
+    tracemalloc.start(TRACE_FRAMES)
+
+
+class MemoryBudgetExceeded(RuntimeError):
+    pass
+
+
+# ---------- RSS ----------
+def rss_mb() -> float:
+
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    # Linux: KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ---------- COMPONENTS ----------
+_baseline = rss_mb()
+_components = {}
+_lock = threading.Lock()
+
+
+@contextmanager
+def measure(component: str):
+    """
+    Přičte komponentě přírůstek RSS (a tracemalloc) během bloku.
+    Souběžné načítání se navzájem započítá – čísla jsou orientační.
+    """
+    rss0 = rss_mb()
+    traced0 = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+    t0 = time.perf_counter()
+
+    try:
+        yield
+
+    finally:
+        entry = {
+            "rss_mb": round(rss_mb() - rss0, 1),
+            "s": round(time.perf_counter() - t0, 2),
+        }
+        if tracemalloc.is_tracing():
+            entry["python_mb"] = round(
+                (tracemalloc.get_traced_memory()[0] - traced0) / 2**20, 1
+            )
+
+        with _lock:
+            _components[component] = entry
+
+
+def loaded(component: str) -> bool:
+    return component in _components
+
+
+# ---------- BUDGET ----------
+def check_budget(stage: str, extra_mb: float = 0.0, refuse: bool = False):
+    """
+    extra_mb = kolik ještě přibude (odhad) → varuje dřív, než se to stane.
+    refuse=True a MEMORY_BUDGET_ACTION=refuse → MemoryBudgetExceeded.
+    """
+    if BUDGET_MB is None:
+        return
+
+    projected = rss_mb() + extra_mb
+
+    if projected <= BUDGET_MB:
+        return
+
+    message = (
+        f"{stage}: RSS {rss_mb():.0f} MB"
+        + (f" + ~{extra_mb:.0f} MB" if extra_mb else "")
+        + f" > rozpočet {BUDGET_MB:.0f} MB"
+        + ("" if LOW_MEMORY else " (zkus LOW_MEMORY=1 nebo RETRIEVAL_URL)")
+    )
+
+    if refuse and BUDGET_ACTION == "refuse":
+        raise MemoryBudgetExceeded(message)
+
+    print("MEMORY WARNING:", message)
+
+
+def check_startup():
+    """
+    Po načtení všeho, co se načítá při startu. Embedding model se načítá
+    líně (embed_cache) – pokud ještě není v paměti, počítá se jeho odhad.
+    """
+    extra = 0.0 if loaded("embed_model") else EXPECTED_MODEL_MB
+
+    check_budget("start", extra_mb=extra, refuse=True)
+
+
+# ---------- REPORT ----------
+def top_allocations(limit: int = 10) -> list[str]:
+
+    if not tracemalloc.is_tracing():
+        return []
+
+    stats = tracemalloc.take_snapshot().statistics("lineno")
+
+    return [
+        f"{s.size / 2**20:6.1f} MB  {s.count:>7}×  {s.traceback[0]}"
+        for s in stats[:limit]
+    ]
+
+
+def report() -> dict:
+
+    with _lock:
+        components = dict(_components)
+
+    out = {
+        "rss_mb": round(rss_mb(), 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "baseline_mb": round(_baseline, 1),
+        "components": components,
+        "budget_mb": BUDGET_MB,
+        "low_memory": LOW_MEMORY,
+    }
+
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        out["python_mb"] = round(current / 2**20, 1)
+        out["python_peak_mb"] = round(peak / 2**20, 1)
+
+    return out
+
+
+def format_report(r: dict = None) -> str:
+
+    r = r or report()
+
+    lines = [
+        f"RSS {r['rss_mb']:.0f} MB (peak {r['peak_rss_mb']:.0f} MB"
+        + (f", rozpočet {r['budget_mb']:.0f} MB" if r["budget_mb"] else "")
+        + ")"
+        + ("  [LOW_MEMORY]" if r["low_memory"] else ""),
+        f"  {'python + knihovny':<28} {r['baseline_mb']:>7.1f} MB",
+    ]
+
+    for name, c in r["components"].items():
+        lines.append(f"  {name:<28} {c['rss_mb']:>7.1f} MB  {c['s']:>5.2f}s")
+
+    if "python_mb" in r:
+        lines.append(f"tracemalloc {r['python_mb']:.1f} MB (peak {r['python_peak_mb']:.1f} MB)")
+
+    return "\n".join(lines)
@@ -0,0 +1,250 @@
+# prefilter.py
+#
+# Levné předřazení před ask(): zprávy, na které by embedding a jedno
+# až dvě volání Gemini stejně nedaly smysluplnou odpověď, se vyřídí
+# lokálně.
+#
+#   pozdrav                  → „Dobrý den.“ + ux_help()
+#   poděkování / „ok“        → „Rádo se stalo.“ + ux_help()
+#   žádost o radu (krátká)   → poznámka z ux_preprocess + ux_help()
+#   jednoslovný dotaz        → poznámka „příliš obecné“ + ux_help(),
+#                              pokud slovo není v BM25 slovníku žádné báze
+#   jiný jazyk než čeština   → výzva k otázce česky
+#   stejný dotaz znovu       → předchozí odpověď z paměti (spam / dvojklik)
+#
+# Doplňující otázky („a proč?“) procházejí vždy – smysl jim dává sezení.
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import lexical
+import sessions
+import knowledge_bases
+from ux.ux_boat import ux_preprocess, ux_help, NO_ADVICE_NOTE, TOO_GENERAL_NOTE
+
+
+# ---------- CONFIG ----------
+DUPLICATE_WINDOW = 120.0
+MAX_CHATS = 10_000
+
+# krátká žádost o radu = celá zpráva je jen „poradíš mi?“ apod.
+ADVICE_MAX_WORDS = 5
+
+GREETINGS = {
+    "ahoj", "ahojky", "cau", "cus", "zdravim", "nazdar", "dobry den",
+    "dobry vecer", "dobre rano", "hello", "hi", "hey",
+}
+
+# poděkování / potvrzení po odpovědi – „Dobrý den.“ by tu nedávalo smysl
+THANKS = {
+    "dekuji", "dekuju", "diky", "dik", "dekuji moc", "diky moc", "thanks",
+    "thank you", "ok", "okay", "jo", "super", "dobre", "jasne",
+}
+
+# bez diakritiky; česky psaný dotaz jich má nejvýš pár
+ENGLISH_WORDS = {
+    "the", "what", "how", "why", "when", "who", "is", "are", "was", "were",
+    "do", "does", "did", "my", "your", "you", "can", "could", "should",
+    "will", "would", "of", "and", "in", "it", "this", "that", "to", "for",
+    "with", "about", "have", "has", "be",
+}
+
+_CZECH_LETTERS = set("áčďéěíňóřšťúůýž")
+
+# = retrieval.INDEX_DIR (import retrieval by načetl celou výchozí bázi)
+INDEX_DIR = "index"
+
+# degradované odpovědi se nepamatují – opakovaný dotaz má jít znovu na model
+TRANSIENT_PREFIXES = ("Model je dočasně", "Model dočasně", "Reasoner dočasně")
+
+
+def _words(text: str) -> list[str]:
+
+    return "".join(
+        ch if ch.isalnum() else " "
+        for ch in lexical.fold(text)
+    ).split()
+
+
+# ---------- VOCABULARY ----------
+_vocabulary = None
+_vocabulary_lock = threading.Lock()
+
+
+def _load_vocabulary() -> set:
+    """
+    Termy BM25 (lexical.json) výchozí báze a bází z KB_CONFIG.
+    Prázdná množina = slovník není k dispozici.
+    """
+    bases, _ = knowledge_bases.load_config()
+    terms = set()
+
+    for index_dir in [INDEX_DIR, *bases.values()]:
+        path = os.path.join(index_dir, "lexical.json")
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                terms.update(json.load(f)["postings"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"PREFILTER: slovník {path} nedostupný ({e})")
+
+    return terms
+
+
+def known_term(question: str) -> bool:
+    """
+    Najde BM25 pro dotaz aspoň jeden chunk? Bez slovníku → True
+    (o dotazu rozhodne pipeline).
+    """
+    global _vocabulary
+
+    with _vocabulary_lock:
+        if _vocabulary is None:
+            _vocabulary = _load_vocabulary()
+
+    if not _vocabulary:
+        return True
+
+    return any(t in _vocabulary for t in lexical.tokenize(question))
+
+
+def _is_czech(question: str) -> bool:
+
+    if _CZECH_LETTERS & set(question.lower()):
+        return True
+
+    words = _words(question)
+    english = sum(w in ENGLISH_WORDS for w in words)
+    czech = sum(w in lexical.STOPWORDS for w in words)
+
+    return english < 2 or czech >= english
+
+
+def classify(question: str):
+    """
+    Důvod lokální odpovědi, nebo None (→ normální pipeline).
+    Nezávisí na chatu – duplicity řeší local_answer().
+    """
+    words = _words(question)
+
+    if not words:
+        return "empty"
+
+    if " ".join(words) in GREETINGS:
+        return "greeting"
+
+    if " ".join(words) in THANKS:
+        return "thanks"
+
+    if sessions.is_follow_up(question):
+        return None
+
+    note = ux_preprocess(question)["note"]
+
+    if note == NO_ADVICE_NOTE and len(words) <= ADVICE_MAX_WORDS:
+        return "advice"
+
+    # přesný termín z korpusu („monetizace“, „Vine“) hledá lexikální větev
+    if len(words) < 2 and not known_term(question):
+        return "too_short"
+
+    if not _is_czech(question):
+        return "language"
+
+    return None
+
+
+def _reply(reason: str, question: str) -> str:
+
+    if reason == "empty":
+        return "Prázdný dotaz.\n\n" + ux_help()
+
+    if reason == "greeting":
+        return "Dobrý den.\n\n" + ux_help()
+
+    if reason == "thanks":
+        return "Rádo se stalo. Můžete se zeptat na další věc.\n\n" + ux_help()
+
+    if reason == "advice":
+        return ux_preprocess(question)["note"] + "\n\n" + ux_help()
+
+    # ux_preprocess počítá slova podle mezer („🔥 🔥 monetizace“ = 3) → vlastní poznámka
+    if reason == "too_short":
+        return TOO_GENERAL_NOTE + "\n\n" + ux_help()
+
+    if reason == "language":
+        return (
+            "Nástroj odpovídá jen na otázky v češtině "
+            "(this bot answers questions in Czech only).\n\n" + ux_help()
+        )
+
+    return ux_help()
+
+
+# ---------- FILTER ----------
+class PreFilter:
+
+    def __init__(self, window=DUPLICATE_WINDOW, max_chats=MAX_CHATS):
+        self.window = window
+        self.max_chats = max_chats
+
+        self._recent = OrderedDict()    # chat_id → (klíč dotazu, odpověď, ts)
+        self._lock = threading.Lock()
+
+        self.stats = {"checked": 0, "local": {}, "llm_calls_saved": 0}
+
+    def _count(self, reason: str):
+
+        with self._lock:
+            self.stats["local"][reason] = self.stats["local"].get(reason, 0) + 1
+            # každý lokální dotaz by stál aspoň grounded volání
+            self.stats["llm_calls_saved"] += 1
+
+    def local_answer(self, question: str, chat_id=None):
+        """
+        Lokální odpověď, nebo None.
+        """
+        self.stats["checked"] += 1
+
+        reason = classify(question)
+
+        if reason is not None:
+            self._count(reason)
+            return _reply(reason, question)
+
+        if chat_id is None:
+            return None
+
+        key = " ".join(_words(question))
+
+        with self._lock:
+            recent = self._recent.get(chat_id)
+
+        if recent and recent[0] == key and time.time() - recent[2] < self.window:
+            self._count("duplicate")
+            return recent[1]
+
+        return None
+
+    def forget(self, chat_id):
+
+        with self._lock:
+            self._recent.pop(chat_id, None)
+
+    def remember(self, question: str, chat_id, answer: str):
+
+        if chat_id is None or answer.lstrip().startswith(TRANSIENT_PREFIXES):
+            return
+
+        with self._lock:
+            self._recent[chat_id] = (" ".join(_words(question)), answer, time.time())
+            self._recent.move_to_end(chat_id)
+
+            while len(self._recent) > self.max_chats:
+                self._recent.popitem(last=False)
+
+
+prefilter = PreFilter()
@@ -1,23 +1,59 @@
 import os
-import json
-import faiss
+import time
+import unicodedata
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 from google import genai
-from functools import lru_cache
+from google.genai import types
 
+import knowledge_bases
+import llm
+import memory
+import router
+import sessions
+import template
+from scheduler import estimate_tokens
+import tracing
+from singleflight import SingleFlight
 
-# ---------- CONFIG ----------
-INDEX_DIR = "index"
 
+# ---------- CONFIG ----------
 TOP_K = 4
-FAISS_K = 8
 
-embed_model = SentenceTransformer("all-MiniLM-L6-v2")
+LAYER_PRIORITY = ["meta", "synth", "raw"]
+
+# strop viditelné odpovědi pro každou cestu; reasoner má ~3000 znaků
+# výstupu, zbytek ořízne template.repair
+GENERATION = {
+    "grounded": {"max_output_tokens": 2048, "temperature": 0.2},
+    "reasoner": {"max_output_tokens": 4096, "temperature": 0.5},
+}
 
-LLM_MODEL = "models/gemini-3-pro-preview"
+# tokeny uvažování se u thinking modelů počítají do max_output_tokens →
+# pevný rozpočet (gemini-2.5) / nízká úroveň (gemini-3) a stejná rezerva
+# navíc ke stropu, ať dlouhé přemýšlení nesní odpověď
+THINKING = {
+    "grounded": int(os.getenv("LLM_THINKING_GROUNDED", "512")),
+    "reasoner": int(os.getenv("LLM_THINKING_REASONER", "2048")),
+}
 
-LAYER_PRIORITY = ["meta", "synth", "raw"]
+
+def generation_config(step: str, model: str) -> types.GenerateContentConfig:
+
+    params = dict(GENERATION[step])
+    budget = THINKING[step]
+
+    if "gemini-3" in model:
+        # gemini-3 nebere thinking_budget spolu s úrovní – jen úroveň
+        thinking = types.ThinkingConfig(thinking_level=types.ThinkingLevel.LOW)
+    elif "gemini-2.5" in model:
+        thinking = types.ThinkingConfig(thinking_budget=budget)
+    else:
+        # model bez uvažování
+        return types.GenerateContentConfig(**params)
+
+    params["max_output_tokens"] += budget
+
+    return types.GenerateContentConfig(**params, thinking_config=thinking)
 
 
 # ---------- RAG SYSTEM ----------
@@ -268,28 +304,152 @@ TOPICS = """
 # ---------- LOAD ----------
 load_dotenv()
 
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+with memory.measure("gemini_client"):
+    client = genai.Client(
+        api_key=os.getenv("GEMINI_API_KEY"),
+        # HTTP timeout v ms – ať vlákno po deadlinu v llm.call nevisí věčně
+        http_options=types.HttpOptions(
+            timeout=int(max(llm.TIMEOUTS.values()) * 1000)
+        )
+    )
+
+# RETRIEVAL_URL → embedding + index běží ve sdíleném retrieval_server.py,
+# tento proces drží jen chunks.json a volá ho po HTTP
+RETRIEVAL_URL = os.getenv("RETRIEVAL_URL")
+
+with memory.measure("retrieval"):
+    if RETRIEVAL_URL:
+        import retrieval_client
+        retriever = retrieval_client.RemoteRetriever(RETRIEVAL_URL)
+    else:
+        import retrieval as retriever
+
+chunks = retriever.chunks
+
+INDEX_VERSION = retriever.INDEX_VERSION
+
+# další korpusy (knowledge_bases.json) – výchozí je retriever výše
+registry = knowledge_bases.create_registry(retriever)
+
+
+# ---------- NORMALIZACE ----------
+def normalize_question(question: str) -> str:
+    """
+    Klíč pro de-duplikaci: velikost písmen, mezery a koncová
+    interpunkce nehrají roli („Proč?“ == „proč“).
+    """
+    q = unicodedata.normalize("NFC", question).lower()
+    q = " ".join(q.split())
+    return q.rstrip("?!.… ")
+
+
+# ---------- LLM CALL ----------
+def generate(prompt: str, trace=None, step: str = "grounded"):
+    """
+    Jediné místo, kde se volá Gemini. Model vybírá router.py podle kroku;
+    slabá odpověď rychlého modelu se jednou zopakuje na silnějším.
+    Vrací text odpovědi (může být prázdný), výjimky propouští dál.
+    """
+    tier = router.tier_for(step)
+    text, outcome = _generate(prompt, trace, step, tier)
+
+    stronger = router.escalation(tier, outcome)
 
-EMBED_MODEL_PATH = "all-MiniLM-L6-v2"
+    if stronger is None:
+        return text
+
+    print(f"LLM ESCALATE ({step}: {tier} → {stronger}, {outcome})")
+    router.stats.escalated(tier)
+
+    try:
+        return _generate(prompt, trace, step, stronger)[0]
+
+    except llm.LLMUnavailable:
+        # uříznutá odpověď je pořád lepší než degradovaný režim
+        if text:
+            return text
+        raise
+
+
+def _generate(prompt: str, trace, step: str, tier: str):
+    """
+    Jedno volání – měří čas a zapisuje do trace a statistik tieru.
+    """
+    model = router.model_for(tier)
+
+    t0 = time.perf_counter()
+    outcome = "error"
+    usage = None
+
+    try:
+        response = llm.call(
+            lambda: client.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=generation_config(step, model)
+            ),
+            step=step,
+            chat_id=trace.get("chat") if trace else None,
+            tokens=estimate_tokens(prompt, step)
+        )
 
+        usage = getattr(response, "usage_metadata", None)
+        text = (response.text or "").strip()
 
-index = faiss.read_index(os.path.join(INDEX_DIR, "faiss.index"))
+        if not text:
+            outcome = "empty"
+        elif "NEDOLOŽENO" in text:
+            outcome = "nedolozeno"
+        elif _hit_token_limit(response):
+            outcome = "max_tokens"
+        else:
+            outcome = "ok"
 
-with open(os.path.join(INDEX_DIR, "chunks.json"), "r", encoding="utf-8") as f:
-    chunks = json.load(f)
+        return text, outcome
 
+    except llm.CircuitOpen:
+        outcome = "circuit_open"
+        raise
+
+    except llm.LLMTimeout:
+        outcome = "timeout"
+        raise
+
+    finally:
+        seconds = time.perf_counter() - t0
+
+        tracing.record_llm(trace, step, model, len(prompt), seconds, outcome)
+        router.stats.record(tier, seconds, outcome, usage)
+
+
+def _hit_token_limit(response) -> bool:
+
+    candidates = getattr(response, "candidates", None) or []
+
+    return bool(candidates) and candidates[0].finish_reason == types.FinishReason.MAX_TOKENS
+
+
+# ---------- DEGRADED ----------
+def degraded_answer(docs) -> str:
+    """
+    Gemini nedostupné → pošli nalezené úryvky doslova, s tagem vrstvy.
+    """
+    if not docs:
+        return "Model je dočasně přetížený a k dotazu nemám lokální data. Zkus to za chvíli."
+
+    body = "\n\n".join(
+        f"[{c['layer'].upper()}|{c.get('source', '?')}]\n{c['text']}"
+        for c in docs[:TOP_K]
+    )
 
-# ---------- CACHE ----------
-@lru_cache(maxsize=512)
-def embed_question_cached(question: str):
-    return embed_model.encode(
-        [question],
-        normalize_embeddings=True
-    ).astype("float32")
+    return (
+        "Model je dočasně přetížený – posílám nalezené úryvky z dat "
+        "bez interpretace.\n\n" + body
+    )
 
 
 # ---------- REASONER ----------
-def run_reasoner(question: str):
+def run_reasoner(question: str, trace=None, evidence=None):
 
     prompt = f"""
 {REASONER_SYSTEM}
@@ -301,67 +461,168 @@ OTÁZKA:
 """
 
     try:
-        response = client.models.generate_content(
-            model=LLM_MODEL,
-            contents=prompt
-        )
+        text = generate(prompt, trace, step="reasoner")
 
-        if not response.text:
+        if not text:
             return "Epistemický prostor je příliš řídký pro smysluplnou inferenci."
 
-        return response.text.strip()
+        # chybějící bloky šablony doplnit / dlouhý výstup zkrátit lokálně,
+        # ne dalším voláním modelu
+        text, fixes = template.repair(text, question, evidence)
+
+        if fixes and trace is not None:
+            trace["template"] = fixes
+
+        return text
+
+    except llm.LLMUnavailable as e:
+        print("REASONER UNAVAILABLE:", e)
+        if trace is not None:
+            trace["path"] = "degraded"
+        return degraded_answer(evidence)
 
     except Exception as e:
         print("REASONER ERROR:", e)
+
+        # nalezené úryvky jsou užitečnější než holé „nedostupný“
+        if evidence:
+            if trace is not None:
+                trace["path"] = "degraded"
+            return degraded_answer(evidence)
+
         return "Reasoner dočasně nedostupný."
 
 
-# ---------- LAYER CLASSIFIER ----------
-def classify_question(question: str) -> list[str]:
+# ---------- CORE ----------
+inflight = SingleFlight()
 
-    q = question.lower()
+session_store = sessions.create_store()
 
-    if any(x in q for x in [
-        "pozorováno",
-        "zaznamenáno",
-        "případy",
-        "události"
-    ]):
-        return ["raw", "synth"]
 
-    if any(x in q for x in [
-        "jak",
-        "proč",
-        "vzorce"
-    ]):
-        return ["synth", "meta"]
+def ask(question: str, chat_id=None, retrieved=None, kb: str = None) -> str:
+    """
+    chat_id slouží plánovači LLM volání (férová fronta mezi chaty),
+    paměti konverzace pro doplňující otázky a výběru znalostní báze.
 
-    if any(x in q for x in [
-        "nevíme",
-        "zkreslení",
-        "limity"
-    ]):
-        return ["meta", "synth"]
+    retrieved = (layers, hits) z <báze>.retrieve_batch – dávka otázek
+    pak sdílí jeden embedding a hledání (viz api_server.py).
+    kb = název báze (jinak podle chatu, viz knowledge_bases.py).
+    """
+    trace = tracing.new_trace(question, chat_id)
 
-    return ["synth"]
+    name, base = registry.resolve(chat_id, kb)
 
+    if name != knowledge_bases.DEFAULT:
+        trace["kb"] = name
 
-# ---------- CORE ----------
-def ask(question: str) -> str:
+    # „a proč?“ znamená v každém chatu něco jiného → neslučovat napříč chaty
+    scope = chat_id if sessions.is_follow_up(question) else None
+
+    try:
+        # stejná otázka už běží → počkej na její výsledek
+        (answer, leader_id, leader_session, evidence), shared = inflight.do(
+            (normalize_question(question), name, base.INDEX_VERSION, scope),
+            lambda: (
+                _ask(question, trace, base, retrieved),
+                trace["id"],
+                _session_key(trace),
+                (trace.get("chunks"), trace.get("layers")),
+            )
+        )
+
+        if shared:
+            trace["path"] = "coalesced"
+            trace["leader"] = leader_id
+
+            # sezení followeru z evidence leadera – jinak by jeho „a proč?“
+            # hledalo jen samo sebe
+            chat_key = _session_key(trace)
+            chunk_ids, layers = evidence
+
+            if chat_key is not None and chat_key != leader_session and chunk_ids:
+                session_store.add(chat_key, sessions.make_turn(question, chunk_ids, layers))
+
+        return answer
+
+    finally:
+        tracing.finish(trace)
+
+
+def _session_key(trace: dict):
+
+    chat_id = trace.get("chat")
+
+    # id chunků v sezení platí jen pro jednu bázi
+    if chat_id is not None and "kb" in trace:
+        chat_id = f"{trace['kb']}:{chat_id}"
+
+    return chat_id
+
+
+def _ask(question: str, trace: dict, base, retrieved=None) -> str:
 
     if not question.strip():
+        trace["path"] = "empty"
         return "Prázdný dotaz."
 
-    allowed_layers = classify_question(question)
+    chat_id = _session_key(trace)
+    chunks = base.chunks
+
+    previous = None
+    if chat_id is not None and sessions.is_follow_up(question):
+        previous = session_store.last(chat_id)
+
+    # do sezení jde vždy samostatná (kořenová) otázka, ne narůstající řetěz
+    # „… (doplňující otázka) a proč?“ – ten by zkrácení v make_turn
+    # po pár kolech připravilo o původní otázku
+    root = question
+
+    if previous is not None:
+
+        # doplňující otázka → evidence z minulého kola, bez embeddingu a hledání
+        root = previous.question
+        question = f"{root}\n(doplňující otázka) {question}"
+
+        allowed_layers = list(previous.layers)
+        hits = [(i, None) for i in previous.chunks if i < len(chunks)]
+
+        tracing.record_followup(trace, question)
+
+    elif retrieved is not None:
+
+        allowed_layers, hits = retrieved
 
-    q_vec = embed_question_cached(question)
+    else:
 
-    distances, indices = index.search(q_vec, FAISS_K)
+        try:
+            allowed_layers, hits = base.retrieve(question)
 
-    if indices.size == 0:
-        return run_reasoner(question)
+        except Exception as e:
+            # retrieval server nedostupný / chyba indexu → reasoner bez evidence
+            # (při nedostupném LLM ten vrátí degradovanou odpověď)
+            print("RETRIEVAL ERROR:", e)
 
-    candidates = [chunks[i] for i in indices[0]]
+            trace["path"] = "reasoner:retrieval_error"
+            return run_reasoner(question, trace)
+
+    if chat_id is not None and hits:
+        session_store.add(
+            chat_id,
+            sessions.make_turn(root, [i for i, _ in hits], allowed_layers)
+        )
+
+    if not hits:
+        trace["path"] = "reasoner:no_hits"
+        return run_reasoner(question, trace)
+
+    tracing.record_retrieval(
+        trace,
+        allowed_layers,
+        [i for i, _ in hits],
+        [d for _, d in hits]
+    )
+
+    candidates = [chunks[i] for i, _ in hits]
 
     filtered = [
         c for c in candidates
@@ -370,7 +631,8 @@ def ask(question: str) -> str:
 
     # 👉 pokud nemáme evidenci → druhý mozek
     if not filtered:
-        return run_reasoner(question)
+        trace["path"] = "reasoner:no_evidence"
+        return run_reasoner(question, trace, evidence=candidates)
 
     priority_map = {layer: i for i, layer in enumerate(LAYER_PRIORITY)}
 
@@ -396,24 +658,31 @@ OTÁZKA:
 
     try:
 
-        response = client.models.generate_content(
-            model=LLM_MODEL,
-            contents=prompt
-        )
-
-        if not response.text:
-            return run_reasoner(question)
+        text = generate(prompt, trace, step="grounded")
 
-        text = response.text.strip()
+        if not text:
+            trace["path"] = "reasoner:empty"
+            return run_reasoner(question, trace, evidence=context_docs)
 
         # 🔥 kritická pojistka
         if "NEDOLOŽENO" in text:
-            return run_reasoner(question)
+            trace["path"] = "reasoner:nedolozeno"
+            return run_reasoner(question, trace, evidence=context_docs)
 
+        trace["path"] = "grounded"
         return text
 
+    except llm.LLMUnavailable as e:
+
+        # timeout / otevřený breaker → druhé volání by dopadlo stejně
+        print("LLM UNAVAILABLE:", e)
+
+        trace["path"] = "degraded"
+        return degraded_answer(context_docs)
+
     except Exception as e:
 
         print("LLM ERROR:", e)
 
-        return run_reasoner(question)
+        trace["path"] = "reasoner:llm_error"
+        return run_reasoner(question, trace, evidence=context_docs)
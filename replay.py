@@ -0,0 +1,218 @@
+# replay.py
+#
+# Přehraje zaznamenaný dotaz z logs/traces.jsonl a porovná časy.
+#
+#   python replay.py --list              # posledních 20 trace
+#   python replay.py --slow 10           # trace delší než 10 s
+#   python replay.py <trace_id>          # stub LLM (zopakuje zaznamenané latence)
+#   python replay.py <trace_id> --real   # skutečné volání Gemini
+
+import sys
+import time
+import argparse
+
+from google.genai import types
+
+import llm
+import tracing
+
+
+# ---------- STUB LLM ----------
+STUB_TEXT = {
+    "ok": "STUB ODPOVĚĎ",
+    "empty": "",
+    "nedolozeno": "NEDOLOŽENO – odpověď není v datech.",
+    "max_tokens": "STUB ODPOVĚĎ (uříznutá)",
+}
+
+
+class _StubCandidate:
+
+    def __init__(self, finish_reason):
+        self.finish_reason = finish_reason
+
+
+class _StubResponse:
+
+    def __init__(self, text, finish_reason=types.FinishReason.STOP):
+        self.text = text
+        self.candidates = [_StubCandidate(finish_reason)]
+
+
+class _StubModels:
+
+    def __init__(self, calls):
+        self.calls = list(calls)
+
+    def generate_content(self, model, contents, **kwargs):
+
+        if not self.calls:
+            return _StubResponse(STUB_TEXT["ok"])
+
+        call = self.calls.pop(0)
+
+        if call["outcome"] == "circuit_open":
+            raise llm.CircuitOpen("stub: zaznamenaný otevřený breaker")
+
+        if call["outcome"] == "timeout":
+            # přesáhni deadline, ať llm.call skončí stejně jako původně
+            time.sleep(call["s"] + 1)
+        else:
+            time.sleep(call["s"])
+
+        if call["outcome"] == "error":
+            raise RuntimeError("stub: zaznamenaná chyba LLM")
+
+        if call["outcome"] == "max_tokens":
+            return _StubResponse(STUB_TEXT["max_tokens"], types.FinishReason.MAX_TOKENS)
+
+        return _StubResponse(STUB_TEXT.get(call["outcome"], STUB_TEXT["ok"]))
+
+
+class StubClient:
+    """
+    Napodobí client.models.generate_content: čeká zaznamenanou dobu
+    a vrátí stejný typ výsledku (ok / prázdno / NEDOLOŽENO / chyba),
+    takže ask() projde stejnou cestou jako původně.
+    """
+
+    def __init__(self, calls):
+        self.models = _StubModels(calls)
+
+
+# ---------- OUTPUT ----------
+def print_trace_line(t):
+
+    print(
+        f"{t['id']}  {t.get('total_s', 0):>7.2f}s  "
+        f"{t.get('path') or '-':<22} "
+        f"{t['question'][:60]!r}"
+    )
+
+
+def compare(original, replayed):
+
+    print(f"\nTRACE {original['id']} → {replayed['id']}")
+    print(f"otázka: {original['question']!r}")
+    print(f"cesta:  {original['path']}  →  {replayed['path']}")
+    print(f"vrstvy: {original['layers']}  →  {replayed['layers']}")
+
+    if original["chunks"] != replayed["chunks"]:
+        print(f"chunky: {original['chunks']}  →  {replayed['chunks']}")
+    else:
+        print(f"chunky: {original['chunks']} (beze změny)")
+
+    print("\nkrok         původně    replay")
+
+    n = max(len(original["llm"]), len(replayed["llm"]))
+
+    for i in range(n):
+        a = original["llm"][i] if i < len(original["llm"]) else None
+        b = replayed["llm"][i] if i < len(replayed["llm"]) else None
+
+        step = (a or b)["step"]
+        sa = f"{a['s']:.2f}s {a['outcome']}" if a else "-"
+        sb = f"{b['s']:.2f}s {b['outcome']}" if b else "-"
+
+        print(f"{step:<12} {sa:<18} {sb}")
+
+    print(
+        f"{'celkem':<12} {original['total_s']:.2f}s{'':<12} "
+        f"{replayed['total_s']:.2f}s"
+    )
+
+
+def replay_input(original: dict):
+    """
+    → (otázka, retrieved) pro ask(). Doplňující otázka se přehraje s
+    otázkou a chunky, ze kterých vznikl původní prompt – bez sezení by
+    „a proč?“ hledalo samo za sebe.
+    """
+    if not original.get("followup"):
+        return original["question"], None
+
+    if "effective_question" not in original:
+        print("Pozor: starší trace doplňující otázky bez effective_question – replay hledá znovu")
+        return original["question"], None
+
+    hits = [(i, None) for i in original["chunks"]]
+
+    return original["effective_question"], (original["layers"], hits)
+
+
+# ---------- MAIN ----------
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Replay trace z ask()")
+    parser.add_argument("trace_id", nargs="?")
+    parser.add_argument("--real", action="store_true",
+                        help="volat skutečné Gemini místo stubu")
+    parser.add_argument("--list", action="store_true")
+    parser.add_argument("--slow", type=float, default=None,
+                        help="vypiš trace delší než N sekund")
+    parser.add_argument("--log", default=tracing.TRACE_LOG)
+
+    args = parser.parse_args(argv)
+
+    if args.list or args.slow is not None:
+        traces = list(tracing.iter_traces(args.log))
+
+        if args.slow is not None:
+            traces = [t for t in traces if (t.get("total_s") or 0) >= args.slow]
+        else:
+            traces = traces[-20:]
+
+        for t in traces:
+            print_trace_line(t)
+        return 0
+
+    if not args.trace_id:
+        parser.print_help()
+        return 1
+
+    original = tracing.find_trace(args.trace_id, args.log)
+
+    if original is None:
+        print(f"Trace {args.trace_id} nenalezen v {args.log}")
+        return 1
+
+    # sloučený dotaz nic nevolal – čas a cestu určil leader
+    if original.get("path") == "coalesced":
+        leader_id = original.get("leader")
+        leader = tracing.find_trace(leader_id, args.log) if leader_id else None
+
+        if leader is None:
+            print(f"Trace {original['id']} je sloučený, leader {leader_id} nenalezen")
+            return 1
+
+        print(f"Trace {original['id']} je sloučený → přehrávám leader {leader['id']}")
+        original = leader
+
+    question, retrieved = replay_input(original)
+
+    # import až tady – načítá model a index
+    import query
+
+    if not args.real:
+        query.client = StubClient(original["llm"])
+
+    captured = {}
+    finish = tracing.finish
+
+    def capture(trace):
+        finish(trace)
+        captured.update(trace)
+
+    tracing.finish = capture
+
+    try:
+        query.ask(question, retrieved=retrieved, kb=original.get("kb"))
+    finally:
+        tracing.finish = finish
+
+    compare(original, captured)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
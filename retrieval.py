@@ -0,0 +1,315 @@
+# retrieval.py
+#
+# Lokální retrieval: embedding otázky + klasifikace vrstvy + hybridní
+# hledání (FAISS + BM25). Používá ho query.py přímo, nebo ho hostuje
+# retrieval_server.py pro více workerů (RETRIEVAL_URL).
+
+import os
+import json
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+import classifier
+import embed_cache
+import lexical
+import memory
+import vector_store
+from ux.allowed_questions import ALLOWED_QUESTIONS
+
+
+# ---------- CONFIG ----------
+INDEX_DIR = "index"
+
+# vzorové otázky vrstev pro klasifikátor báze (volitelné, vedle indexu)
+QUESTIONS_FILE = "questions.json"
+
+FAISS_K = 8
+LEXICAL_K = 8
+
+EMBED_MODEL_PATH = "all-MiniLM-L6-v2"
+
+EMBED_CACHE = os.getenv("EMBED_CACHE", "1") != "0"
+
+EMBED_LRU_SIZE = int(os.getenv("EMBED_LRU_SIZE", "512"))
+
+
+# ---------- EMBEDDING ----------
+# model (i import torch) se načte až při prvním textu, který není v trvalé cache
+_embed_model = None
+_embed_lock = threading.Lock()
+
+
+def get_embed_model():
+
+    global _embed_model
+
+    with _embed_lock:
+        if _embed_model is None:
+            memory.check_budget("embed_model", extra_mb=memory.EXPECTED_MODEL_MB)
+
+            with memory.measure("embed_model"):
+                from sentence_transformers import SentenceTransformer
+                _embed_model = SentenceTransformer(EMBED_MODEL_PATH)
+
+    return _embed_model
+
+
+def _model_encode(texts: list[str]):
+    return get_embed_model().encode(
+        texts,
+        normalize_embeddings=True
+    ).astype("float32")
+
+
+try:
+    vector_cache = embed_cache.EmbeddingCache(EMBED_MODEL_PATH) if EMBED_CACHE else None
+    question_cache = embed_cache.QuestionCache(EMBED_MODEL_PATH) if EMBED_CACHE else None
+except OSError as e:
+    print("EMBED CACHE OFF:", e)
+    vector_cache = question_cache = None
+
+
+def encode(texts: list[str]):
+    """
+    Normalizované float32 embeddingy korpusu; známé texty z disku, zbytek modelem.
+    """
+    if vector_cache is None:
+        return _model_encode(texts)
+
+    return vector_cache.encode(_model_encode, texts)
+
+
+def encode_questions(texts: list[str]):
+    """
+    Dotazy uživatelů: ohraničená trvalá cache dotazů, pak cache korpusu
+    (vzorové otázky), teprve pak model. Korpus se dotazy nezvětšuje.
+    """
+    if question_cache is None:
+        return encode(texts)
+
+    def corpus_or_model(missing):
+        found = vector_cache.lookup([embed_cache.text_key(t) for t in missing])
+
+        if len(found) == len(missing):
+            return np.stack([found[i] for i in range(len(missing))])
+
+        rest = [i for i in range(len(missing)) if i not in found]
+        new = _model_encode([missing[i] for i in rest])
+
+        out = np.empty((len(missing), new.shape[1]), dtype="float32")
+        out[rest] = new
+        for i, v in found.items():
+            out[i] = v
+
+        return out
+
+    return question_cache.encode(corpus_or_model, texts)
+
+
+# ---------- CACHE ----------
+@lru_cache(maxsize=EMBED_LRU_SIZE)
+def embed_question_cached(question: str):
+    return encode_questions([question])
+
+
+# ---------- KNOWLEDGE BASE ----------
+class KnowledgeBase:
+    """
+    Jeden index (faiss + chunks.json + lexical.json) s vlastním
+    klasifikátorem vrstev. Embedding model je sdílený (encode výše),
+    takže další báze stojí jen paměť indexu a chunků.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR, name: str = "default"):
+
+        self.name = name
+        self.index_dir = index_dir
+
+        with memory.measure(f"kb:{name}"):
+            self._load(index_dir)
+
+    def _load(self, index_dir: str):
+
+        # flat / fp16 / sq8 / binary podle meta.json (build_index.py --storage)
+        self.index = vector_store.load(index_dir)
+
+        with open(os.path.join(index_dir, "chunks.json"), "r", encoding="utf-8") as f:
+            self.chunks = json.load(f)
+
+        # BM25 se staví spolu s faiss.index (build_index.py); starší index → postav teď
+        lexical_path = os.path.join(index_dir, "lexical.json")
+
+        if os.path.exists(lexical_path):
+            self.lexical_index = lexical.BM25Index.load(lexical_path)
+        else:
+            self.lexical_index = lexical.BM25Index.build([c["text"] for c in self.chunks])
+
+        st = os.stat(self.index.path)
+        self.INDEX_VERSION = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+        self.classifier_layers, self.classifier_centroids = self._build_classifier()
+
+    # ----- layer classifier -----
+    def _build_classifier(self):
+        """
+        Centroidy vrstev: vzorové otázky (jeden batch při startu)
+        + centroidy chunků z meta.json (build_index.py). Starší index
+        bez nich → spočítat z vektorů indexu (bez nového encode).
+        """
+        question_vecs = {
+            layer: encode(qs)
+            for layer, qs in self._example_questions().items()
+            if qs
+        }
+
+        chunk_centroids = self.index.layer_centroids
+
+        if chunk_centroids is None:
+            chunk_centroids = classifier.chunk_centroids(
+                self.index.vectors(),
+                [c["layer"] for c in self.chunks]
+            )
+
+        return classifier.combine_centroids(question_vecs, chunk_centroids)
+
+    def _example_questions(self) -> dict:
+        """
+        <index>/questions.json, jinak ALLOWED_QUESTIONS jen pro výchozí bázi –
+        české otázky o virálu by jinému korpusu / jazyku směrovaly vrstvy.
+        """
+        path = os.path.join(self.index_dir, QUESTIONS_FILE)
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        return ALLOWED_QUESTIONS if self.name == "default" else {}
+
+    def classify_question(self, question: str, q_vec=None) -> list[str]:
+        """
+        q_vec = embedding, který už ask() spočítal pro FAISS → žádné další volání modelu.
+        """
+        if q_vec is None:
+            q_vec = embed_question_cached(question)
+
+        return classifier.classify(
+            q_vec[0], self.classifier_layers, self.classifier_centroids
+        )
+
+    # ----- retrieval -----
+    def search(self, question: str, q_vec) -> list[tuple[int, float]]:
+        """
+        Hybridní vyhledávání: FAISS + BM25 sloučené přes reciprocal rank fusion.
+        Vrací [(id chunku, L2 vzdálenost | None u čistě lexikálního zásahu)].
+        """
+        return self.search_batch([question], q_vec)[0]
+
+    def search_batch(self, questions: list[str], q_vecs) -> list[list[tuple[int, float]]]:
+        """
+        Jedno FAISS hledání pro celou dávku, BM25 a fúze po otázkách.
+        """
+        distances, indices = self.index.search(q_vecs, FAISS_K)
+
+        results = []
+
+        for question, dist_row, idx_row in zip(questions, distances, indices):
+
+            dense = {
+                int(i): float(d)
+                for i, d in zip(idx_row, dist_row)
+                if i >= 0
+            }
+
+            lexical_hits = [i for i, _ in self.lexical_index.search(question, LEXICAL_K)]
+
+            fused = lexical.rrf(list(dense), lexical_hits)[:FAISS_K]
+
+            results.append([(i, dense.get(i)) for i in fused])
+
+        return results
+
+    def retrieve(self, question: str):
+        """
+        → (povolené vrstvy, [(id chunku, vzdálenost | None)])
+        """
+        q_vec = embed_question_cached(question)
+
+        return self.classify_question(question, q_vec), self.search(question, q_vec)
+
+    def retrieve_batch(self, questions: list[str]):
+        """
+        Jeden encode a jedno FAISS hledání pro celou dávku.
+        """
+        if not questions:
+            return []
+
+        q_vecs = encode_questions(questions)
+        hits = self.search_batch(questions, q_vecs)
+
+        return [
+            (self.classify_question(q, v[None, :]), h)
+            for q, v, h in zip(questions, q_vecs, hits)
+        ]
+
+    def memory_bytes(self) -> int:
+        """
+        Odhad paměti báze (index + přesné vektory pro re-ranking + chunky
+        + BM25 + centroidy), bez modelu. vectors.npy je mmap – horní odhad.
+        """
+        chunk_bytes = sum(len(c["text"]) * 2 + 300 for c in self.chunks)
+        lexical_bytes = sum(
+            100 + 70 * len(docs) for docs in self.lexical_index.postings.values()
+        )
+
+        return (
+            self.index.memory_bytes()
+            + self.index.rerank_bytes()
+            + chunk_bytes
+            + lexical_bytes
+            + self.classifier_centroids.nbytes
+        )
+
+
+# ---------- DEFAULT ----------
+# index/ jako modul: retrieval.retrieve(), retrieval.chunks, … (query.py,
+# retrieval_server.py, bench_classifier.py). Načte se až při prvním přístupu –
+# worker s RETRIEVAL_URL importuje modul jen kvůli dalším bázím (knowledge_bases.py)
+_DEFAULT_ATTRS = {
+    "index": "index",
+    "chunks": "chunks",
+    "lexical_index": "lexical_index",
+    "INDEX_VERSION": "INDEX_VERSION",
+    "CLASSIFIER_LAYERS": "classifier_layers",
+    "CLASSIFIER_CENTROIDS": "classifier_centroids",
+    "classify_question": "classify_question",
+    "search": "search",
+    "retrieve": "retrieve",
+    "retrieve_batch": "retrieve_batch",
+}
+
+_default_kb = None
+_default_lock = threading.Lock()
+
+
+def get_default_kb() -> KnowledgeBase:
+
+    global _default_kb
+
+    with _default_lock:
+        if _default_kb is None:
+            _default_kb = KnowledgeBase(INDEX_DIR)
+
+    return _default_kb
+
+
+def __getattr__(name: str):
+
+    if name == "default_kb":
+        return get_default_kb()
+
+    if name in _DEFAULT_ATTRS:
+        return getattr(get_default_kb(), _DEFAULT_ATTRS[name])
+
+    raise AttributeError(f"module 'retrieval' has no attribute {name!r}")
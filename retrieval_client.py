@@ -0,0 +1,109 @@
+# retrieval_client.py
+#
+# Vzdálený retrieval: stejné rozhraní jako modul retrieval
+# (retrieve, retrieve_batch, chunks, INDEX_VERSION), ale embedding
+# a index drží retrieval_server.py. Worker načte jen chunks.json.
+
+import os
+import json
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+
+# ---------- CONFIG ----------
+INDEX_DIR = "index"
+
+TIMEOUT = float(os.getenv("RETRIEVAL_TIMEOUT", "10"))
+
+
+def _load_chunks(index_dir: str) -> list[dict]:
+
+    with open(os.path.join(index_dir, "chunks.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RemoteRetriever:
+
+    def __init__(self, url: str, index_dir: str = INDEX_DIR):
+
+        parts = urlsplit(url)
+
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.index_dir = index_dir
+
+        self._local = threading.local()
+
+        health = self._request("GET", "/health")
+
+        self.chunks = _load_chunks(index_dir)
+
+        if len(self.chunks) != health["chunks"]:
+            raise RuntimeError(
+                f"Retrieval server má {health['chunks']} chunků, "
+                f"lokální {index_dir}/chunks.json {len(self.chunks)} – jiný index?"
+            )
+
+        self.INDEX_VERSION = health["index_version"]
+
+        print(f"▶ Remote retrieval {url} (index {self.INDEX_VERSION})")
+
+    # ----- HTTP -----
+    def _conn(self):
+
+        conn = getattr(self._local, "conn", None)
+
+        if conn is None:
+            # keep-alive spojení na vlákno
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=TIMEOUT)
+            self._local.conn = conn
+
+        return conn
+
+    def _request(self, method: str, path: str, payload=None):
+
+        body = None if payload is None else json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if body else {}
+
+        for attempt in range(2):
+            conn = self._conn()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+
+            except (ConnectionError, http.client.HTTPException, OSError):
+                # server mezitím zavřel keep-alive spojení → jednou znovu
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+        if response.status != 200:
+            raise RuntimeError(f"Retrieval server {response.status}: {data[:200]!r}")
+
+        return json.loads(data)
+
+    # ----- API -----
+    def retrieve(self, question: str):
+        return self.retrieve_batch([question])[0]
+
+    def retrieve_batch(self, questions: list[str]):
+
+        if not questions:
+            return []
+
+        data = self._request("POST", "/retrieve", {"questions": questions})
+
+        if data["index_version"] != self.INDEX_VERSION:
+            # server přestavěl index → načti nové chunky (in-place, query.chunks je sdílí)
+            print("RETRIEVAL: změna indexu na serveru, načítám chunks.json")
+            self.chunks[:] = _load_chunks(self.index_dir)
+            self.INDEX_VERSION = data["index_version"]
+
+        return [
+            (r["layers"], [(int(i), d) for i, d in r["hits"]])
+            for r in data["results"]
+        ]
@@ -0,0 +1,172 @@
+# retrieval_server.py
+#
+# Jeden teplý proces s embedding modelem a indexem pro více workerů.
+#
+#   python retrieval_server.py
+#   RETRIEVAL_URL=http://127.0.0.1:8765 python telegram_bot.py
+#
+# Na platformě s Procfile běží každý typ procesu v jiném kontejneru –
+# server a workery spouštěj společně přes launcher.py.
+#
+# GET  /health    → {index_version, chunks, storage, memory}
+# POST /retrieve  {"questions": [...]} → {index_version, results: [{layers, hits}]}
+#
+# Souběžné požadavky se slučují do jedné dávky (jeden encode pro všechny).
+
+import memory  # první – LOW_MEMORY mění výchozí limity ostatních modulů
+
+import os
+import json
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import retrieval
+
+
+# ---------- CONFIG ----------
+HOST = os.getenv("RETRIEVAL_HOST", "127.0.0.1")
+PORT = int(os.getenv("RETRIEVAL_PORT", "8765"))
+
+BATCH_MAX = int(os.getenv("RETRIEVAL_BATCH_MAX", "32"))
+BATCH_WAIT = float(os.getenv("RETRIEVAL_BATCH_WAIT_MS", "5")) / 1000
+
+MAX_QUESTIONS = 256
+
+
+# ---------- BATCHER ----------
+class Batcher:
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self.stats = {"batches": 0, "questions": 0}
+
+        threading.Thread(target=self._loop, daemon=True, name="batcher").start()
+
+    def submit(self, questions: list[str]) -> Future:
+        future = Future()
+        self._queue.put((questions, future))
+        return future
+
+    def _loop(self):
+
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + BATCH_WAIT
+
+            # chvíli počkej na další požadavky → jeden encode pro všechny
+            while size < BATCH_MAX:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            questions = [q for qs, _ in pending for q in qs]
+
+            try:
+                results = retrieval.retrieve_batch(questions)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["questions"] += len(questions)
+
+            offset = 0
+            for qs, future in pending:
+                future.set_result(results[offset:offset + len(qs)])
+                offset += len(qs)
+
+
+batcher = Batcher()
+
+
+# ---------- HTTP ----------
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, payload: dict):
+
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+
+        if self.path != "/health":
+            return self._send(404, {"error": "not found"})
+
+        self._send(200, {
+            "index_version": retrieval.INDEX_VERSION,
+            "chunks": len(retrieval.chunks),
+            "storage": retrieval.index.storage,
+            **batcher.stats,
+            "memory": memory.report(),
+        })
+
+    def do_POST(self):
+
+        if self.path != "/retrieve":
+            return self._send(404, {"error": "not found"})
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            questions = json.loads(self.rfile.read(length))["questions"]
+        except (ValueError, KeyError, TypeError):
+            return self._send(400, {"error": "očekávám {\"questions\": [...]}"})
+
+        if not isinstance(questions, list) or len(questions) > MAX_QUESTIONS:
+            return self._send(400, {"error": f"questions: seznam ≤ {MAX_QUESTIONS}"})
+
+        try:
+            results = batcher.submit([str(q) for q in questions]).result()
+        except Exception as e:
+            print("RETRIEVAL ERROR:", e)
+            return self._send(500, {"error": str(e)})
+
+        self._send(200, {
+            "index_version": retrieval.INDEX_VERSION,
+            "results": [
+                {"layers": layers, "hits": hits}
+                for layers, hits in results
+            ],
+        })
+
+    def log_message(self, format, *args):
+        # bez access logu na každý dotaz
+        pass
+
+
+def main():
+
+    server = ThreadingHTTPServer((HOST, PORT), Handler)
+    server.daemon_threads = True
+
+    print(f"▶ Retrieval server http://{HOST}:{PORT} ({len(retrieval.chunks)} chunků)")
+
+    print(memory.format_report())
+
+    try:
+        memory.check_startup()
+    except memory.MemoryBudgetExceeded as e:
+        raise SystemExit(f"MEMORY BUDGET: {e}")
+
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# router.py
+#
+# Výběr modelu podle kroku:
+#   grounded → fast (jen přeformuluje pár krátkých chunků)
+#   reasoner → pro
+#
+# Slabá odpověď rychlého modelu (prázdná / uříznutá limitem tokenů)
+# se jednou zopakuje na pro modelu. Pro každý tier se sbírá latence,
+# tokeny a odhad ceny – podle toho se mapování ladí.
+#
+#   LLM_MODEL_FAST, LLM_MODEL_PRO   – jména modelů
+#   LLM_ROUTE_GROUNDED=pro          – vrátit grounded na pro model
+#   LLM_ESCALATE=0                  – bez eskalace
+
+import os
+import threading
+from collections import deque
+
+
+# ---------- CONFIG ----------
+TIERS = {
+    "fast": os.getenv("LLM_MODEL_FAST", "models/gemini-2.5-flash"),
+    "pro": os.getenv("LLM_MODEL_PRO", "models/gemini-3-pro-preview"),
+}
+
+ROUTES = {
+    "grounded": os.getenv("LLM_ROUTE_GROUNDED", "fast"),
+    "reasoner": os.getenv("LLM_ROUTE_REASONER", "pro"),
+}
+
+ESCALATE = os.getenv("LLM_ESCALATE", "1") != "0"
+
+# USD za 1M tokenů (vstup, výstup vč. thinking) – jen pro odhad nákladů
+PRICES = {
+    "fast": (0.30, 2.50),
+    "pro": (2.00, 12.00),
+}
+
+# outcome z query.generate, po kterém má smysl zkusit silnější model
+ESCALATE_ON = {"empty", "max_tokens"}
+
+
+def tier_for(step: str) -> str:
+    return ROUTES.get(step, "pro")
+
+
+def model_for(tier: str) -> str:
+    return TIERS[tier]
+
+
+def escalation(tier: str, outcome: str):
+    """
+    Tier pro druhý pokus, nebo None.
+    """
+    if ESCALATE and tier != "pro" and outcome in ESCALATE_ON:
+        return "pro"
+
+    return None
+
+
+# ---------- STATS ----------
+class TierStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers = {}
+
+    def _tier(self, tier):
+        return self._tiers.setdefault(tier, {
+            "calls": 0,
+            "errors": 0,
+            "escalations": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cost_usd": 0.0,
+            "latencies": deque(maxlen=500),
+        })
+
+    def record(self, tier: str, seconds: float, outcome: str, usage=None):
+
+        input_tokens = getattr(usage, "prompt_token_count", None) or 0
+        output_tokens = (
+            (getattr(usage, "candidates_token_count", None) or 0)
+            + (getattr(usage, "thoughts_token_count", None) or 0)
+        )
+
+        price_in, price_out = PRICES.get(tier, (0.0, 0.0))
+
+        with self._lock:
+            s = self._tier(tier)
+            s["calls"] += 1
+            s["errors"] += outcome in ("error", "timeout", "circuit_open")
+            s["input_tokens"] += input_tokens
+            s["output_tokens"] += output_tokens
+            s["cost_usd"] += (input_tokens * price_in + output_tokens * price_out) / 1e6
+            s["latencies"].append(seconds)
+
+    def escalated(self, tier: str):
+
+        with self._lock:
+            self._tier(tier)["escalations"] += 1
+
+    def snapshot(self) -> dict:
+
+        out = {}
+
+        with self._lock:
+            for tier, s in self._tiers.items():
+                lat = sorted(s["latencies"])
+                out[tier] = {
+                    "model": TIERS.get(tier),
+                    **{k: v for k, v in s.items() if k != "latencies"},
+                    "cost_usd": round(s["cost_usd"], 4),
+                    "p50_s": round(lat[len(lat) // 2], 2) if lat else None,
+                    "p95_s": round(lat[min(len(lat) - 1, int(0.95 * len(lat)))], 2) if lat else None,
+                }
+
+        return out
+
+
+stats = TierStats()
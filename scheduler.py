@@ -0,0 +1,215 @@
+# scheduler.py
+#
+# Plánovač před každým generate_content:
+# - rozpočet requests/min a tokens/min (sdílený GEMINI_API_KEY)
+# - priorita: levné grounded volání před dlouhým reasonerem
+# - férová fronta mezi chaty (round-robin přes virtuální čas)
+# - adaptace limitu podle 429 (multiplikativní pokles, pomalý návrat)
+
+import os
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+
+
+# ---------- CONFIG ----------
+RPM = int(os.getenv("LLM_RPM", "60"))
+TPM = int(os.getenv("LLM_TPM", "1000000"))
+
+MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", "30"))
+
+# 429 → limit * BACKOFF, pauza THROTTLE_PAUSE s; úspěch → limit + RECOVER
+BACKOFF = 0.5
+RECOVER = 0.5
+THROTTLE_PAUSE = float(os.getenv("LLM_THROTTLE_PAUSE", "10"))
+
+PRIORITY = {
+    "grounded": 0,
+    "reasoner": 1,
+}
+
+# hrubý odhad výstupu pro rezervaci TPM (skutečnost se dopočte po odpovědi)
+EXPECTED_OUTPUT_TOKENS = {
+    "grounded": 400,
+    "reasoner": 1500,
+}
+
+WINDOW = 60.0
+
+
+def estimate_tokens(prompt: str, step: str) -> int:
+    # ~4 znaky na token, čeština spíš méně → konzervativně 3
+    return len(prompt) // 3 + EXPECTED_OUTPUT_TOKENS.get(step, 500)
+
+
+def is_rate_limited(error: Exception) -> bool:
+
+    if getattr(error, "code", None) == 429:
+        return True
+
+    text = str(error)
+
+    return "429" in text or "RESOURCE_EXHAUSTED" in text
+
+
+class QueueTimeout(Exception):
+    pass
+
+
+# ---------- SCHEDULER ----------
+class Scheduler:
+
+    def __init__(self, rpm=RPM, tpm=TPM):
+        self.max_rpm = rpm
+        self.rpm = float(rpm)
+        self.tpm = tpm
+
+        self._window = deque()      # (čas, tokeny) přidělených volání
+        self._tokens = 0
+        self._paused_until = 0.0
+
+        self._queue = []            # heap (priorita, kolo, seq, ticket)
+        self._seq = itertools.count()
+        self._vtime = 0             # kolo naposledy obslouženého ticketu
+        self._chat_round = {}
+
+        self._cond = threading.Condition()
+
+        self.stats = {"granted": 0, "throttled": 0, "queue_timeouts": 0}
+
+    # ----- budget -----
+    def _expire(self, now):
+
+        while self._window and now - self._window[0][0] >= WINDOW:
+            _, tokens = self._window.popleft()
+            self._tokens -= tokens
+
+    def _wait_needed(self, tokens, now) -> float:
+        """
+        0 = lze hned, jinak kolik sekund počkat.
+        """
+        if now < self._paused_until:
+            return self._paused_until - now
+
+        over_rpm = len(self._window) >= max(1, int(self.rpm))
+        over_tpm = self._window and self._tokens + tokens > self.tpm
+
+        if not over_rpm and not over_tpm:
+            return 0.0
+
+        return max(0.05, WINDOW - (now - self._window[0][0]))
+
+    # ----- public -----
+    def acquire(self, chat_id, step: str, tokens: int, timeout=MAX_QUEUE_WAIT) -> dict:
+
+        ticket = {"chat": chat_id, "tokens": tokens, "t": None}
+
+        with self._cond:
+
+            # nový chat začíná na aktuálním kole, ne na nule
+            rnd = max(self._chat_round.get(chat_id, 0) + 1, self._vtime)
+            self._chat_round[chat_id] = rnd
+
+            entry = (PRIORITY.get(step, 1), rnd, next(self._seq), ticket)
+            heapq.heappush(self._queue, entry)
+
+            deadline = time.monotonic() + timeout
+
+            while True:
+                now = time.monotonic()
+                self._expire(time.time())
+
+                if self._queue[0] is entry:
+                    wait_for = self._wait_needed(tokens, time.time())
+
+                    if wait_for == 0:
+                        heapq.heappop(self._queue)
+                        self._grant(ticket, rnd)
+                        self._cond.notify_all()
+                        return ticket
+                else:
+                    wait_for = 1.0
+
+                if now >= deadline:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self.stats["queue_timeouts"] += 1
+                    self._cond.notify_all()
+                    raise QueueTimeout(
+                        f"LLM fronta: čekání > {timeout:g}s ({len(self._queue)} ve frontě)"
+                    )
+
+                self._cond.wait(min(wait_for, deadline - now))
+
+    def _grant(self, ticket, rnd):
+
+        ticket["t"] = time.time()
+        self._window.append((ticket["t"], ticket["tokens"]))
+        self._tokens += ticket["tokens"]
+        self._vtime = rnd
+        self.stats["granted"] += 1
+
+        # chaty pozadu za virtuálním časem by stejně začínaly na _vtime
+        if len(self._chat_round) > 1000:
+            self._chat_round = {
+                c: r for c, r in self._chat_round.items() if r > rnd
+            }
+
+    def note_extra(self, tokens: int):
+        """
+        Volání mimo frontu (hedge) – jen započítat do rozpočtu.
+        """
+        with self._cond:
+            self._window.append((time.time(), tokens))
+            self._tokens += tokens
+
+    def commit(self, ticket: dict, actual_tokens):
+        """
+        Po odpovědi nahraď odhad skutečnou spotřebou tokenů.
+        """
+        if not actual_tokens:
+            return
+
+        with self._cond:
+            for i, (t, tokens) in enumerate(self._window):
+                if t == ticket["t"] and tokens == ticket["tokens"]:
+                    self._window[i] = (t, actual_tokens)
+                    self._tokens += actual_tokens - tokens
+                    break
+
+            self._cond.notify_all()
+
+    def throttle(self):
+        """
+        429 od Gemini → sniž limit a krátce zastav výdej.
+        """
+        with self._cond:
+            self.rpm = max(1.0, self.rpm * BACKOFF)
+            self._paused_until = time.time() + THROTTLE_PAUSE
+            self.stats["throttled"] += 1
+
+        print(f"LLM 429 → limit {self.rpm:.1f} rpm")
+
+    def relax(self):
+
+        with self._cond:
+            if self.rpm < self.max_rpm:
+                self.rpm = min(self.max_rpm, self.rpm + RECOVER)
+                self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+
+        with self._cond:
+            self._expire(time.time())
+            return {
+                "rpm_limit": round(self.rpm, 1),
+                "rpm_used": len(self._window),
+                "tpm_used": self._tokens,
+                "queued": len(self._queue),
+                **self.stats,
+            }
+
+
+scheduler = Scheduler()
@@ -0,0 +1,239 @@
+# sessions.py
+#
+# Krátká paměť konverzace pro každý chat: posledních N dotazů
+# a id chunků, které k nim retrieval našel. Doplňující otázka
+# („a proč?“) pak použije předchozí evidenci místo nového hledání.
+#
+# Výchozí úložiště je v paměti procesu (LRU + TTL + strop paměti).
+# SESSION_DB=cesta.sqlite → sdílené mezi více workery.
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, deque, namedtuple
+
+import lexical
+
+
+# ---------- CONFIG ----------
+MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "5"))
+TTL = float(os.getenv("SESSION_TTL", str(30 * 60)))
+MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(2 * 1024 * 1024)))
+
+SESSION_DB = os.getenv("SESSION_DB")
+
+# otázka se ukládá zkrácená (konec – u řetězených doplňujících otázek
+# je nejnovější část nejdůležitější)
+MAX_QUESTION_CHARS = 300
+
+
+Turn = namedtuple("Turn", ["ts", "question", "chunks", "layers"])
+
+
+def _turn_bytes(turn: Turn) -> int:
+    # hrubý odhad: text + id chunků + režie tuple/deque
+    return len(turn.question) * 2 + len(turn.chunks) * 28 + 200
+
+
+def make_turn(question: str, chunk_ids, layers) -> Turn:
+
+    return Turn(
+        time.time(),
+        question[-MAX_QUESTION_CHARS:],
+        tuple(int(i) for i in chunk_ids),
+        tuple(layers),
+    )
+
+
+# ---------- FOLLOW-UP ----------
+# bez diakritiky (lexical.fold); celá zpráva = jedna z frází
+FOLLOW_UP_PHRASES = {
+    "a proc", "a proc ne", "a co dal", "co dal", "a dal", "a potom", "a pak",
+    "a co s tim", "co s tim", "a co to znamena", "co to znamena",
+    "jak to myslis", "jak to", "proc to", "a jak dal", "a co ted",
+    "rozved to", "vysvetli to", "vic", "podrobneji",
+}
+
+# slova bez obsahu: tázací, spojky, zájmena odkazující na předchozí odpověď
+FUNCTION_WORDS = {
+    "a", "i", "ale", "tak", "takze", "pak", "potom", "dal", "ne", "je", "jsou",
+    "s", "o", "v", "na", "proc", "jak", "co", "kdy", "kdo", "kde", "kolik",
+    "to", "tohle", "toho", "tom", "tim", "tomu", "ono", "tam", "tady", "ten",
+    "ta", "ty", "tenhle", "tahle",
+}
+
+FOLLOW_UP_MAX_WORDS = 3
+
+
+def is_follow_up(question: str) -> bool:
+    """
+    Dotaz, který dává smysl jen s předchozí otázkou: známá fráze
+    („a proč?“, „co dál?“), nebo nejvýš FOLLOW_UP_MAX_WORDS slov
+    a žádné z nich nenese obsah („proč to?“, „a tohle?“).
+    """
+    words = "".join(
+        ch if ch.isalnum() else " "
+        for ch in lexical.fold(question)
+    ).split()
+
+    if not words:
+        return False
+
+    if " ".join(words) in FOLLOW_UP_PHRASES:
+        return True
+
+    return len(words) <= FOLLOW_UP_MAX_WORDS and all(w in FUNCTION_WORDS for w in words)
+
+
+# ---------- IN-MEMORY ----------
+class MemorySessionStore:
+
+    def __init__(self, max_turns=MAX_TURNS, ttl=TTL, max_bytes=MAX_BYTES):
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._chats = OrderedDict()     # chat_id → deque[Turn], LRU pořadí
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, chat_id):
+        turns = self._chats.pop(chat_id)
+        self._bytes -= sum(_turn_bytes(t) for t in turns)
+
+    def _expire(self, now):
+        # nejstarší přístup je na začátku → stačí projít zleva
+        while self._chats:
+            chat_id, turns = next(iter(self._chats.items()))
+            if turns and now - turns[-1].ts < self.ttl:
+                break
+            self._drop(chat_id)
+
+    def last(self, chat_id):
+
+        with self._lock:
+            self._expire(time.time())
+
+            turns = self._chats.get(chat_id)
+            if not turns:
+                return None
+
+            if time.time() - turns[-1].ts >= self.ttl:
+                self._drop(chat_id)
+                return None
+
+            self._chats.move_to_end(chat_id)
+            return turns[-1]
+
+    def add(self, chat_id, turn: Turn):
+
+        with self._lock:
+            turns = self._chats.get(chat_id)
+
+            if turns is None:
+                turns = deque(maxlen=self.max_turns)
+                self._chats[chat_id] = turns
+
+            if len(turns) == turns.maxlen:
+                self._bytes -= _turn_bytes(turns[0])
+
+            turns.append(turn)
+            self._bytes += _turn_bytes(turn)
+            self._chats.move_to_end(chat_id)
+
+            self._expire(turn.ts)
+
+            # tvrdý strop paměti → vyhazuj nejdéle nepoužité chaty
+            while self._bytes > self.max_bytes and len(self._chats) > 1:
+                self._drop(next(iter(self._chats)))
+
+    def stats(self) -> dict:
+
+        with self._lock:
+            return {"chats": len(self._chats), "bytes": self._bytes}
+
+
+# ---------- SQLITE ----------
+class SqliteSessionStore:
+    """
+    Stejné API, data v sqlite (WAL) – více workerů vidí stejné sezení.
+    """
+
+    def __init__(self, path, max_turns=MAX_TURNS, ttl=TTL):
+        self.path = path
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self._local = threading.local()
+
+        with self._conn() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS turns ("
+                " chat_id TEXT NOT NULL,"
+                " ts REAL NOT NULL,"
+                " question TEXT NOT NULL,"
+                " chunks TEXT NOT NULL,"
+                " layers TEXT NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS turns_chat ON turns (chat_id, ts)"
+            )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def last(self, chat_id):
+
+        row = self._conn().execute(
+            "SELECT ts, question, chunks, layers FROM turns"
+            " WHERE chat_id = ? AND ts > ? ORDER BY ts DESC LIMIT 1",
+            (str(chat_id), time.time() - self.ttl)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return Turn(row[0], row[1], tuple(json.loads(row[2])), tuple(json.loads(row[3])))
+
+    def add(self, chat_id, turn: Turn):
+
+        with self._conn() as db:
+            db.execute(
+                "INSERT INTO turns VALUES (?, ?, ?, ?, ?)",
+                (
+                    str(chat_id),
+                    turn.ts,
+                    turn.question,
+                    json.dumps(turn.chunks),
+                    json.dumps(turn.layers),
+                )
+            )
+            db.execute(
+                "DELETE FROM turns WHERE chat_id = ? AND rowid NOT IN ("
+                " SELECT rowid FROM turns WHERE chat_id = ?"
+                " ORDER BY ts DESC LIMIT ?)",
+                (str(chat_id), str(chat_id), self.max_turns)
+            )
+            db.execute("DELETE FROM turns WHERE ts < ?", (turn.ts - self.ttl,))
+
+    def stats(self) -> dict:
+
+        row = self._conn().execute(
+            "SELECT COUNT(DISTINCT chat_id), COUNT(*) FROM turns"
+        ).fetchone()
+
+        return {"chats": row[0], "turns": row[1]}
+
+
+def create_store():
+
+    if SESSION_DB:
+        return SqliteSessionStore(SESSION_DB)
+
+    return MemorySessionStore()
@@ -0,0 +1,68 @@
+# singleflight.py
+#
+# Souběžná volání se stejným klíčem sdílí jeden běžící výpočet.
+# Když skupina pošle stejnou virální otázku během pár sekund,
+# embedding + Gemini proběhne jen jednou.
+
+import threading
+
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        """
+        Vrací (výsledek, sdíleno). První volající (leader) spustí fn(),
+        ostatní s týmž klíčem čekají na jeho výsledek (nebo výjimku).
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                leader = True
+                self.stats["leaders"] += 1
+            else:
+                leader = False
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+
+            if flight.error is not None:
+                raise flight.error
+
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+
+        except BaseException as e:
+            flight.error = e
+            raise
+
+        finally:
+            # po dokončení už nový dotaz spustí nový výpočet
+            with self._lock:
+                self._flights.pop(key, None)
+
+            flight.done.set()
+
+    def in_flight(self) -> int:
+
+        with self._lock:
+            return len(self._flights)
@@ -1,4 +1,9 @@
+import memory  # první – LOW_MEMORY mění výchozí limity ostatních modulů
+
 import os
+import sys
+import json
+import asyncio
 from dotenv import load_dotenv
 from telegram.ext import (
     Application,
@@ -9,7 +14,10 @@ from telegram.ext import (
 
 from telegram.error import NetworkError, BadRequest
 
-from query import ask, TOPICS, LAYERS_EXPLANATION
+from api import handle_question
+from knowledge_bases import UnknownKnowledgeBase
+from prefilter import prefilter
+from query import TOPICS, LAYERS_EXPLANATION, registry, session_store
 
 load_dotenv()
 
@@ -18,6 +26,11 @@ TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 if not TOKEN:
     raise RuntimeError("Missing TELEGRAM_BOT_TOKEN")
 
+# /stats jen pro tyto chaty (čárkami oddělená id)
+ADMIN_CHAT_IDS = {
+    int(x) for x in os.getenv("ADMIN_CHAT_IDS", "").split(",") if x.strip()
+}
+
 
 # ------------------------------------------------
 # SAFE MESSAGE SPLITTER
@@ -54,6 +67,76 @@ async def layers_command(update, context):
     await send_long_message(update, LAYERS_EXPLANATION)
 
 
+async def kb_command(update, context):
+
+    chat_id = update.effective_chat.id
+    names = registry.names()
+
+    if not context.args:
+        await send_long_message(
+            update,
+            f"Znalostní báze: {registry.selected(chat_id)}\n"
+            f"Dostupné: {', '.join(names)}\n\n/kb <název> = přepnout"
+        )
+        return
+
+    name = context.args[0]
+
+    try:
+        registry.select(chat_id, name)
+    except UnknownKnowledgeBase:
+        await send_long_message(update, f"Neznámá báze „{name}“. Dostupné: {', '.join(names)}")
+        return
+
+    # zapamatované odpovědi patří k předchozí bázi
+    prefilter.forget(chat_id)
+
+    await send_long_message(update, f"Znalostní báze přepnuta na: {name}")
+
+
+async def stats_command(update, context):
+
+    if update.effective_chat.id not in ADMIN_CHAT_IDS:
+        return
+
+    import llm
+    import router
+
+    caches = {}
+
+    # lokální retrieval (bez RETRIEVAL_URL) → cache embeddingů v tomto procesu
+    retrieval = sys.modules.get("retrieval")
+    if retrieval is not None:
+        caches["embed_lru"] = retrieval.embed_question_cached.cache_info()._asdict()
+        if retrieval.vector_cache is not None:
+            caches["embed_disk"] = {
+                "vectors": len(retrieval.vector_cache),
+                **retrieval.vector_cache.stats,
+            }
+        if retrieval.question_cache is not None:
+            caches["embed_questions"] = {
+                "vectors": len(retrieval.question_cache),
+                "generation": retrieval.question_cache.generation,
+                **retrieval.question_cache.stats,
+            }
+
+    sections = [
+        memory.format_report(),
+        "\n".join(memory.top_allocations(8)),
+        json.dumps({
+            "sessions": session_store.stats(),
+            "knowledge_bases": registry.snapshot(),
+            "caches": caches,
+            "prefilter": prefilter.stats,
+            "models": router.stats.snapshot(),
+            "scheduler": llm.scheduler.snapshot(),
+            "breaker": llm.breaker.state,
+        }, ensure_ascii=False, indent=1),
+    ]
+
+    await send_long_message(update, "\n\n".join(s for s in sections if s))
+
+
 # ------------------------------------------------
 # MESSAGES
 # ------------------------------------------------
@@ -71,7 +154,14 @@ async def handle_message(update, context):
 
     try:
 
-        answer = ask(question)
+        # ask() blokuje (embedding + Gemini) → mimo event loop,
+        # ať ostatní chaty mezitím čekají ve férové frontě plánovače;
+        # handle_question napřed zkusí lokální odpověď (prefilter.py)
+        answer = await asyncio.to_thread(
+            handle_question,
+            question,
+            update.effective_chat.id
+        )
 
     except Exception as e:
 
@@ -109,11 +199,25 @@ def main():
 
     print("▶ Starting epistemic bot")
 
-    app = Application.builder().token(TOKEN).build()
+    print(memory.format_report())
+
+    try:
+        memory.check_startup()
+    except memory.MemoryBudgetExceeded as e:
+        raise SystemExit(f"MEMORY BUDGET: {e}")
+
+    app = (
+        Application.builder()
+        .token(TOKEN)
+        .concurrent_updates(True)
+        .build()
+    )
 
     # commands
     app.add_handler(CommandHandler("topics", topics_command))
     app.add_handler(CommandHandler("layers", layers_command))
+    app.add_handler(CommandHandler("kb", kb_command))
+    app.add_handler(CommandHandler("stats", stats_command))
 
     # messages
     app.add_handler(
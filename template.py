@@ -0,0 +1,148 @@
+# template.py
+#
+# Lokální kontrola výstupní šablony reasoneru (REASONER_WRAPPER v query.py).
+# Místo dalšího volání LLM se chybějící povinné bloky doplní a příliš
+# dlouhý výstup se zkrátí na hranici bloku s „[TRUNCATED]“.
+#
+# Povinné: TITUL, PERCEPTUÁLNÍ KOTVY (3 řádky), aspoň jedna karta
+# (🔹 Mechanismus), CALIBRATION SCORE.
+
+import re
+
+
+# ---------- CONFIG ----------
+MAX_CHARS = 3000
+
+ANCHORS = ["RIZIKOVÁ HUSTOTA", "VOLATILITA PROSTŘEDÍ", "PREDIKOVATELNOST"]
+
+TRUNCATED = "[TRUNCATED]"
+
+LOW_CALIBRATION_NOTE = "NOTE: vysoká míra spekulace — označeno jako Modelový prior."
+
+_TITLE = re.compile(r"^[\s\-•*]*TITUL\s*:", re.MULTILINE)
+_ANCHORS = re.compile(r"^[\s\-•*]*PERCEPTU[AÁ]LN[IÍ] KOTVY.*\n?", re.MULTILINE)
+_CARD = re.compile(r"^\s*🔹?\s*Mechanismus\s*:", re.MULTILINE)
+_CALIBRATION = re.compile(r"^[\s\-•*]*CALIBRATION SCORE\s*:\s*([123])?.*$", re.MULTILINE)
+_SOURCE_TAG = re.compile(r"\[(?:RAW|SYNTH|META)\|[^\]]+\]")
+
+
+def check(text: str) -> list[str]:
+    """
+    Chybějící povinné části (prázdný seznam = šablona v pořádku).
+    """
+    missing = []
+
+    if not _TITLE.search(text):
+        missing.append("titul")
+
+    for anchor in ANCHORS:
+        if not re.search(rf"{anchor}\s*:", text):
+            missing.append("kotvy")
+            break
+
+    if not _CARD.search(text):
+        missing.append("karty")
+
+    if not _CALIBRATION.search(text):
+        missing.append("calibration")
+
+    return missing
+
+
+def _title_for(question: str) -> str:
+    words = question.split()
+    return " ".join(words[:6]).rstrip("?!.,") if words else "Bez názvu"
+
+
+def _anchor_block(text: str) -> str:
+
+    lines = ["- PERCEPTUÁLNÍ KOTVY:"]
+
+    for anchor in ANCHORS:
+        m = re.search(rf"{anchor}\s*:\s*([^\n]+)", text)
+        lines.append(f"  {anchor}: {m.group(1).strip() if m else 'neurčeno'}")
+
+    return "\n".join(lines)
+
+
+def _trim(text: str, limit: int, keep_tail: str, sources: list[str]) -> str:
+    """
+    Zkrátí na poslední celý blok (prázdný řádek) před limitem.
+    """
+    footer = f"\n\n{TRUNCATED}"
+    if sources:
+        footer += "\nZdroje: " + ", ".join(sources)
+    if keep_tail:
+        footer += "\n\n" + keep_tail
+
+    budget = max(0, limit - len(footer))
+    cut = text.rfind("\n\n", 0, budget)
+
+    if cut < budget // 2:
+        cut = text.rfind("\n", 0, budget)
+    if cut <= 0:
+        cut = budget
+
+    return text[:cut].rstrip() + footer
+
+
+def repair(text: str, question: str = "", evidence=None, limit: int = MAX_CHARS):
+    """
+    Vrací (text, opravy). evidence = chunky z retrievalu (pro seznam zdrojů
+    při zkrácení). Chybějící karty se nevymýšlejí – jen se zapíšou do oprav.
+    """
+    fixes = check(text)
+
+    if "kotvy" in fixes:
+        # doplň blok pod titul (nebo na začátek); existující řádky kotev se převezmou
+        block = _anchor_block(text)
+        for anchor in ANCHORS:
+            text = re.sub(rf"^.*{anchor}\s*:.*\n?", "", text, flags=re.MULTILINE)
+        text = _ANCHORS.sub("", text)
+        m = _TITLE.search(text)
+        if m:
+            end = text.find("\n", m.end())
+            end = len(text) if end < 0 else end
+            text = f"{text[:end]}\n\n{block}\n{text[end:]}"
+        else:
+            text = f"{block}\n\n{text}"
+        text = re.sub(r"\n{3,}", "\n\n", text)
+
+    if "titul" in fixes:
+        text = f"- TITUL: {_title_for(question)}\n\n{text}"
+
+    if "calibration" in fixes:
+        text = (
+            f"{text.rstrip()}\n\n"
+            "- CALIBRATION SCORE: 1 — šablona neúplná, skóre doplněno automaticky."
+        )
+
+    m = _CALIBRATION.search(text)
+    calibration = m.group(0).strip() if m else ""
+
+    if m and m.group(1) == "1":
+        calibration += "\n" + LOW_CALIBRATION_NOTE
+        if LOW_CALIBRATION_NOTE not in text:
+            text = text[:m.end()] + "\n" + LOW_CALIBRATION_NOTE + text[m.end():]
+
+    if len(text) > limit:
+
+        sources = list(dict.fromkeys(_SOURCE_TAG.findall(text)))
+        if not sources and evidence:
+            sources = list(dict.fromkeys(
+                f"[{c['layer'].upper()}|{c.get('source', '?')}]" for c in evidence
+            ))
+
+        # CALIBRATION SCORE zůstane i po zkrácení – přesune se na konec
+        body = text
+        if calibration:
+            body = body[:m.start()] + body[m.end():]
+            body = body.replace(LOW_CALIBRATION_NOTE, "")
+
+        # model sám zkrátil, ale moc pozdě → jeho značku nahradí naše
+        body = body.replace(TRUNCATED, "")
+
+        text = _trim(body.rstrip(), limit, calibration, sources[:5])
+        fixes.append("zkráceno")
+
+    return text, fixes
@@ -0,0 +1,8 @@
+# tests/conftest.py
+#
+# Moduly leží v kořeni repa (bez balíčku) → přidat ho na sys.path.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
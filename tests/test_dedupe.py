@@ -0,0 +1,67 @@
+# tests/test_dedupe.py
+
+import numpy as np
+
+import dedupe
+
+
+def _unit(rows):
+    x = np.asarray(rows, dtype="float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+BASE = "Po virálu se pozornost přesouvá z obsahu na osobu tvůrce a soukromí mizí."
+
+
+def test_near_duplicates_collapse_into_longest_with_all_sources():
+
+    chunks = [
+        {"text": BASE, "source": "raw/a.txt", "layer": "raw"},
+        {"text": "Monetizace přichází až po smlouvě.", "source": "raw/b.txt", "layer": "raw"},
+        {"text": BASE + " Vždy.", "source": "raw/c.txt", "layer": "raw"},
+    ]
+    vectors = _unit([[1, 0, 0], [0, 1, 0], [1, 0.01, 0]])
+
+    out, out_vecs, clusters = dedupe.collapse(chunks, vectors)
+
+    assert clusters == [[0, 2]]
+
+    # reprezentant = nejdelší text, pořadí ostatních zachované
+    assert [c["text"] for c in out] == [chunks[1]["text"], chunks[2]["text"]]
+    assert out[1]["sources"] == ["raw/a.txt", "raw/c.txt"]
+
+    np.testing.assert_array_equal(out_vecs, vectors[[1, 2]])
+
+
+def test_layers_are_never_merged():
+
+    chunks = [
+        {"text": BASE, "source": "raw/a.txt", "layer": "raw"},
+        {"text": BASE, "source": "synth/a.txt", "layer": "synth"},
+    ]
+    vectors = _unit([[1, 0], [1, 0]])
+
+    out, _, clusters = dedupe.collapse(chunks, vectors)
+
+    assert clusters == []
+    assert out == chunks
+
+
+def test_same_text_different_meaning_needs_both_signals():
+
+    # skoro stejný text, ale embedding pod COSINE_MIN → zůstanou oba
+    chunks = [
+        {"text": BASE, "source": "raw/a.txt", "layer": "raw"},
+        {"text": BASE + "!", "source": "raw/b.txt", "layer": "raw"},
+    ]
+    vectors = _unit([[1, 0], [0.5, 1]])
+
+    assert dedupe.find_clusters(chunks, vectors) == []
+
+
+def test_jaccard_estimate():
+
+    a = dedupe.minhash(BASE)
+
+    assert dedupe.jaccard(a, dedupe.minhash(BASE.upper())) == 1.0
+    assert dedupe.jaccard(a, dedupe.minhash("Něco úplně jiného o algoritmech.")) < 0.2
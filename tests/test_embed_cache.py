@@ -0,0 +1,152 @@
+# tests/test_embed_cache.py
+
+import multiprocessing
+
+import numpy as np
+
+import embed_cache
+from embed_cache import EmbeddingCache, QuestionCache, text_key
+
+
+DIM = 4
+
+
+def fake_encode(texts):
+    # deterministický „model“: vektor z hashe textu
+    return np.stack([
+        np.frombuffer(text_key(t)[:DIM * 4].ljust(DIM * 4, b"\0"), dtype="uint8")[:DIM]
+        .astype("float32") for t in texts
+    ])
+
+
+class Counting:
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return fake_encode(texts)
+
+
+# ---------- CORPUS ----------
+def test_encode_caches_and_reopens(tmp_path):
+
+    model = Counting()
+    cache = EmbeddingCache("m", str(tmp_path))
+
+    first = cache.encode(model, ["a", "b", "a"])
+    again = EmbeddingCache("m", str(tmp_path)).encode(model, ["b", "a", "c"])
+
+    assert model.calls == [["a", "b", "a"], ["c"]]
+    np.testing.assert_array_equal(first[0], again[1])
+    np.testing.assert_array_equal(first[1], again[0])
+    assert len(EmbeddingCache("m", str(tmp_path))) == 3
+
+
+def test_normalized_text_shares_key(tmp_path):
+
+    model = Counting()
+    cache = EmbeddingCache("m", str(tmp_path))
+
+    cache.encode(model, ["Jaké  vzorce?"])
+    cache.encode(model, [" Jaké vzorce? "])
+
+    assert len(model.calls) == 1
+
+
+def test_torn_write_is_ignored_and_overwritten(tmp_path):
+
+    cache = EmbeddingCache("m", str(tmp_path))
+    cache.encode(fake_encode, ["a"])
+
+    # pád po zápisu vektoru, před zápisem klíče
+    with open(cache.vec_path, "ab") as f:
+        f.write(b"\x01" * (DIM * 4 + 3))
+
+    reopened = EmbeddingCache("m", str(tmp_path))
+    assert len(reopened) == 1
+
+    out = reopened.encode(fake_encode, ["b", "a"])
+
+    np.testing.assert_array_equal(out, fake_encode(["b", "a"]))
+    assert len(EmbeddingCache("m", str(tmp_path))) == 2
+
+
+def _worker(folder, start):
+    EmbeddingCache("m", folder).encode(fake_encode, [f"t{i}" for i in range(start, start + 50)])
+
+
+def test_processes_share_one_cache(tmp_path):
+
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_worker, args=(str(tmp_path), s)) for s in (0, 25, 50)]
+
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+    cache = EmbeddingCache("m", str(tmp_path))
+    texts = [f"t{i}" for i in range(100)]
+
+    assert len(cache) == 100
+    np.testing.assert_array_equal(cache.encode(fake_encode, texts), fake_encode(texts))
+
+
+# ---------- QUESTIONS ----------
+def test_question_cache_survives_restart(tmp_path):
+
+    model = Counting()
+    QuestionCache("m", str(tmp_path), max_rows=100).encode(model, ["q1", "q2"])
+    QuestionCache("m", str(tmp_path), max_rows=100).encode(model, ["q2", "q1"])
+
+    assert model.calls == [["q1", "q2"]]
+
+
+def test_question_cache_is_bounded(tmp_path):
+
+    cache = QuestionCache("m", str(tmp_path), max_rows=10)
+
+    for i in range(100):
+        cache.encode(fake_encode, [f"q{i}"])
+
+    assert len(cache) <= 10
+    assert cache.stats["rotations"] >= 9
+
+    gens = [p.name for p in (tmp_path / "m").iterdir() if p.name.startswith("gen-")]
+    assert len(gens) <= 2
+
+
+def test_recently_used_question_is_promoted(tmp_path):
+
+    model = Counting()
+    cache = QuestionCache("m", str(tmp_path), max_rows=4)
+
+    cache.encode(model, ["keep", "x1"])        # gen 0 plná → rotace
+    cache.encode(model, ["keep"])              # zásah v předchozí → přepis do aktuální
+    cache.encode(model, ["x2", "x3"])          # další rotace smaže gen 0
+
+    model.calls.clear()
+    cache.encode(model, ["keep", "x1"])
+
+    assert cache.stats["promoted"] == 2
+    assert model.calls == [["x1"]]
+
+
+def test_question_cache_follows_rotation_in_other_instance(tmp_path):
+
+    a = QuestionCache("m", str(tmp_path), max_rows=4)
+    b = QuestionCache("m", str(tmp_path), max_rows=4)
+
+    a.encode(fake_encode, ["q1", "q2"])
+
+    model = Counting()
+    b.encode(model, ["q1"])
+
+    assert b.generation == a.generation
+    assert model.calls == []
+
+
+def test_default_caps_are_positive():
+    assert embed_cache.QUESTION_CACHE_ROWS > 0
@@ -0,0 +1,139 @@
+# tests/test_knowledge_bases.py
+
+import json
+import threading
+
+import pytest
+
+import knowledge_bases
+from knowledge_bases import Registry, UnknownKnowledgeBase, DEFAULT
+
+
+class FakeKB:
+
+    def __init__(self, name, size=0):
+        self.name = name
+        self.chunks = []
+        self.size = size
+
+    def memory_bytes(self):
+        return self.size
+
+
+class Loader:
+
+    def __init__(self, sizes=None):
+        self.sizes = sizes or {}
+        self.loaded = []
+
+    def __call__(self, name, index_dir):
+        self.loaded.append(name)
+        return FakeKB(name, self.sizes.get(name, 0))
+
+
+def _registry(loader, **kwargs):
+    bases = {name: f"indexes/{name}" for name in "abc"}
+    return Registry(FakeKB(DEFAULT), bases, {"5": "b"}, loader=loader, **kwargs)
+
+
+def test_default_and_unknown():
+
+    registry = _registry(Loader())
+
+    assert registry.get().name == DEFAULT
+    assert registry.get(DEFAULT).name == DEFAULT
+    assert registry.names() == [DEFAULT, "a", "b", "c"]
+
+    with pytest.raises(UnknownKnowledgeBase):
+        registry.get("x")
+
+    with pytest.raises(UnknownKnowledgeBase):
+        registry.select(1, "x")
+
+
+def test_bases_load_once_and_evict_least_recently_used():
+
+    loader = Loader()
+    registry = _registry(loader, max_resident=2)
+
+    a = registry.get("a")
+    registry.get("b")
+    assert registry.get("a") is a           # zásah → „a“ je nejnovější
+
+    registry.get("c")                       # uvolní „b“, ne „a“
+
+    assert loader.loaded == ["a", "b", "c"]
+    assert list(registry.snapshot()["resident"]) == ["a", "c"]
+    assert registry.stats == {"loads": 3, "evictions": 1}
+
+    registry.get("b")
+    assert loader.loaded[-1] == "b"
+
+
+def test_byte_budget_evicts_but_keeps_the_new_base():
+
+    loader = Loader({"a": 60, "b": 60, "c": 200})
+    registry = _registry(loader, max_resident=10, max_bytes=100)
+
+    registry.get("a")
+    registry.get("b")                       # 120 B > 100 → pryč „a“
+    assert list(registry.snapshot()["resident"]) == ["b"]
+
+    # sama přes rozpočet → zůstane (jinak by nešla použít)
+    assert registry.get("c").name == "c"
+    assert list(registry.snapshot()["resident"]) == ["c"]
+
+
+def test_concurrent_first_use_loads_once():
+
+    gate = threading.Event()
+    loader = Loader()
+
+    def slow(name, index_dir):
+        gate.wait(5)
+        return loader(name, index_dir)
+
+    registry = _registry(slow)
+
+    got = []
+    threads = [
+        threading.Thread(target=lambda: got.append(registry.get("a")))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join(5)
+
+    assert loader.loaded == ["a"]
+    assert len({id(kb) for kb in got}) == 1
+
+
+def test_resolve_chat_selection():
+
+    registry = _registry(Loader())
+
+    assert registry.resolve(5)[0] == "b"
+    assert registry.resolve(6)[0] == DEFAULT
+    assert registry.resolve(5, "a")[0] == "a"
+
+    registry.select(6, "c")
+    assert registry.selected(6) == "c"
+    assert registry.resolve(6)[0] == "c"
+
+    # báze zmizela z konfigurace → výchozí
+    registry.bases.pop("c")
+    assert registry.resolve(6)[0] == DEFAULT
+
+
+def test_load_config(tmp_path):
+
+    path = tmp_path / "kb.json"
+    path.write_text(json.dumps({
+        "bases": {"en": "indexes/en"},
+        "chats": {123: "en"},
+    }))
+
+    assert knowledge_bases.load_config(str(path)) == ({"en": "indexes/en"}, {"123": "en"})
+    assert knowledge_bases.load_config(str(tmp_path / "chybí.json")) == ({}, {})
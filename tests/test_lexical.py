@@ -0,0 +1,55 @@
+# tests/test_lexical.py
+
+import pytest
+
+import lexical
+
+
+@pytest.mark.parametrize("text, tokens", [
+    ("Proč je monetizace", ["monetizac"]),
+    ("Content Houses!", ["content", "hous"]),
+    ("ČESKÉ  znaky", ["cesk", "znak"]),
+    ("", []),
+])
+def test_tokenize_folds_drops_stopwords_and_stems(text, tokens):
+    assert lexical.tokenize(text) == tokens
+
+
+def test_tokenize_matches_inflected_forms():
+    assert lexical.tokenize("monetizace") == lexical.tokenize("monetizací")
+    assert lexical.tokenize("soukromí") == lexical.tokenize("soukromím")
+
+
+def test_short_words_keep_their_stem():
+    # kmen kratší než MIN_STEM se neřeže
+    assert lexical.stem("oko") == "oko"
+    assert lexical.stem("vine") == "vin"
+
+
+def test_rrf_prefers_documents_in_both_rankings():
+
+    fused = lexical.rrf([1, 2, 3], [3, 4])
+
+    assert fused[0] == 3
+    assert set(fused) == {1, 2, 3, 4}
+
+    # jedno pořadí → zůstane beze změny
+    assert lexical.rrf([5, 6, 7]) == [5, 6, 7]
+    assert lexical.rrf() == []
+
+
+def test_bm25_round_trip(tmp_path):
+
+    idx = lexical.BM25Index.build([
+        "Monetizace po virálu.",
+        "Tvůrci z Vine skončili.",
+        "Soukromí a monetizace obsahu.",
+    ])
+
+    path = tmp_path / "lexical.json"
+    idx.save(str(path))
+    loaded = lexical.BM25Index.load(str(path))
+
+    assert [i for i, _ in idx.search("monetizace", 3)] == [0, 2]
+    assert loaded.search("monetizace", 3) == idx.search("monetizace", 3)
+    assert loaded.search("neexistuje", 3) == []
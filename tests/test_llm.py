@@ -0,0 +1,174 @@
+# tests/test_llm.py
+
+import time
+
+import pytest
+
+import llm
+import scheduler as scheduler_module
+
+
+class RateLimited(Exception):
+    code = 429
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    b = llm.CircuitBreaker(threshold=1, cooldown=0.05)
+    monkeypatch.setattr(llm, "breaker", b)
+    return b
+
+
+@pytest.fixture
+def sched(monkeypatch):
+    s = scheduler_module.Scheduler(rpm=1000, tpm=10**9)
+    monkeypatch.setattr(scheduler_module, "THROTTLE_PAUSE", 0.0)
+    monkeypatch.setattr(llm, "scheduler", s)
+    return s
+
+
+def _fail():
+    raise RuntimeError("boom")
+
+
+def _open(breaker):
+    with pytest.raises(RuntimeError):
+        llm.call(_fail)
+    assert breaker.state == "open"
+    time.sleep(breaker.cooldown)
+    assert breaker.state == "half-open"
+
+
+# ---------- BREAKER ----------
+def test_breaker_opens_after_threshold(breaker, sched):
+
+    breaker.threshold = 2
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            llm.call(_fail)
+
+    assert breaker.state == "open"
+
+    with pytest.raises(llm.CircuitOpen):
+        llm.call(lambda: "ok")
+
+
+def test_half_open_probe_success_closes(breaker, sched):
+
+    _open(breaker)
+
+    assert llm.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+    assert not breaker.probing
+
+
+def test_half_open_probe_failure_reopens(breaker, sched):
+
+    _open(breaker)
+
+    with pytest.raises(RuntimeError):
+        llm.call(_fail)
+
+    assert breaker.state == "open"
+    assert not breaker.probing
+
+
+def test_probe_released_after_rate_limit(breaker, sched):
+
+    _open(breaker)
+
+    def limited():
+        raise RateLimited("429 RESOURCE_EXHAUSTED")
+
+    with pytest.raises(llm.LLMUnavailable):
+        llm.call(limited)
+
+    assert not breaker.probing
+    assert llm.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_probe_released_after_queue_timeout(breaker, sched, monkeypatch):
+
+    _open(breaker)
+
+    def timeout(*args, **kwargs):
+        raise scheduler_module.QueueTimeout("fronta")
+
+    monkeypatch.setattr(sched, "acquire", timeout)
+
+    with pytest.raises(llm.LLMUnavailable):
+        llm.call(lambda: "ok")
+
+    assert not breaker.probing
+
+    monkeypatch.undo()
+    monkeypatch.setattr(llm, "breaker", breaker)
+    monkeypatch.setattr(llm, "scheduler", sched)
+
+    assert llm.call(lambda: "ok") == "ok"
+
+
+def test_only_one_probe_at_a_time(breaker):
+
+    breaker.failure()
+    time.sleep(breaker.cooldown)
+
+    assert breaker.before_call() is True
+
+    with pytest.raises(llm.CircuitOpen):
+        breaker.before_call()
+
+
+def test_rate_limit_does_not_count_as_failure(breaker, sched):
+
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RateLimited("429")
+        return "ok"
+
+    assert llm.call(flaky) == "ok"
+    assert breaker.state == "closed"
+    assert sched.stats["throttled"] == 1
+
+
+def test_timeout_counts_as_failure(breaker, sched):
+
+    with pytest.raises(llm.LLMTimeout):
+        llm.call(lambda: time.sleep(0.5), timeout=0.05)
+
+    assert breaker.state == "open"
+
+
+def test_server_error_is_unavailable_and_counts(breaker, sched):
+
+    def server_error():
+        raise RuntimeError("500 INTERNAL server error")
+
+    with pytest.raises(llm.LLMServerError):
+        llm.call(server_error)
+
+    assert breaker.state == "open"
+
+
+def test_client_error_passes_through(breaker, sched):
+
+    def bad_request():
+        raise ValueError("400 INVALID_ARGUMENT")
+
+    with pytest.raises(ValueError):
+        llm.call(bad_request)
+
+
+@pytest.mark.parametrize("error, expected", [
+    (RuntimeError("503 UNAVAILABLE"), True),
+    (RuntimeError("500 server"), True),
+    (RuntimeError("400 bad request"), False),
+    (RuntimeError("boom"), False),
+])
+def test_is_server_error(error, expected):
+    assert llm.is_server_error(error) is expected
@@ -0,0 +1,80 @@
+# tests/test_prefilter.py
+
+import pytest
+
+import lexical
+import prefilter
+from ux import ux_boat
+
+
+@pytest.fixture(autouse=True)
+def vocabulary(monkeypatch):
+    terms = {t for w in ("monetizace", "Vine", "soukromí") for t in lexical.tokenize(w)}
+    monkeypatch.setattr(prefilter, "_vocabulary", terms)
+
+
+@pytest.mark.parametrize("question, reason", [
+    ("", "empty"),
+    ("🔥 🔥", "empty"),
+    ("Ahoj", "greeting"),
+    ("díky!", "thanks"),
+    ("Děkuji moc", "thanks"),
+    ("ok", "thanks"),
+    ("Dobrý den", "greeting"),
+    ("Poradíš mi?", "advice"),
+    ("xyzzy", "too_short"),
+    ("🔥 🔥 xyzzy", "too_short"),
+    ("What should I do about my viral video now?", "language"),
+    ("monetizace", None),
+    ("Vine", None),
+    ("🔥 🔥 monetizace", None),
+    ("a proč?", None),
+    ("Jaké reakce lidí se po virálním zásahu opakují?", None),
+])
+def test_classify(question, reason):
+    assert prefilter.classify(question) == reason
+
+
+@pytest.mark.parametrize("question", ["xyzzy", "🔥 🔥 xyzzy", "Poradíš mi?", "ahoj", ""])
+def test_local_reply_is_text(question):
+    answer = prefilter.PreFilter().local_answer(question)
+    assert isinstance(answer, str) and answer
+
+
+def test_thanks_are_not_answered_with_greeting():
+
+    answer = prefilter.PreFilter().local_answer("díky")
+
+    assert answer.startswith("Rádo se stalo.")
+    assert "Dobrý den" not in answer
+
+
+def test_too_short_uses_shared_note():
+
+    answer = prefilter.PreFilter().local_answer("🔥 🔥 xyzzy")
+
+    assert answer.startswith(ux_boat.TOO_GENERAL_NOTE)
+    assert ux_boat.ux_preprocess("xyzzy")["note"] == ux_boat.TOO_GENERAL_NOTE
+
+
+def test_duplicate_within_window():
+
+    f = prefilter.PreFilter(window=60)
+    question = "Jaké reakce lidí se po virálním zásahu opakují?"
+
+    assert f.local_answer(question, "chat") is None
+
+    f.remember(question, "chat", "odpověď")
+
+    assert f.local_answer(question + "!", "chat") == "odpověď"
+    assert f.local_answer(question, "jiný") is None
+
+
+def test_transient_answer_not_remembered():
+
+    f = prefilter.PreFilter(window=60)
+    question = "Jaké reakce lidí se po virálním zásahu opakují?"
+
+    f.remember(question, "chat", "Model dočasně neodpovídá.")
+
+    assert f.local_answer(question, "chat") is None
@@ -0,0 +1,138 @@
+# tests/test_scheduler.py
+
+import threading
+
+import pytest
+
+import scheduler as scheduler_module
+from scheduler import Scheduler, QueueTimeout, is_rate_limited
+
+
+def test_rpm_limit_blocks_until_timeout():
+
+    s = Scheduler(rpm=2, tpm=10**9)
+
+    s.acquire("a", "grounded", 10)
+    s.acquire("a", "grounded", 10)
+
+    with pytest.raises(QueueTimeout):
+        s.acquire("a", "grounded", 10, timeout=0.1)
+
+    assert s.stats == {"granted": 2, "throttled": 0, "queue_timeouts": 1}
+    assert s.snapshot()["queued"] == 0
+
+
+def test_tpm_limit():
+
+    s = Scheduler(rpm=100, tpm=1000)
+
+    s.acquire("a", "grounded", 900)
+
+    with pytest.raises(QueueTimeout):
+        s.acquire("b", "grounded", 200, timeout=0.1)
+
+
+def test_commit_replaces_estimate():
+
+    s = Scheduler(rpm=100, tpm=1000)
+
+    ticket = s.acquire("a", "grounded", 900)
+    s.commit(ticket, 100)
+
+    assert s.snapshot()["tpm_used"] == 100
+
+    s.acquire("b", "grounded", 800, timeout=0.1)
+
+
+def test_throttle_and_relax(monkeypatch):
+
+    monkeypatch.setattr(scheduler_module, "THROTTLE_PAUSE", 0.0)
+
+    s = Scheduler(rpm=10, tpm=10**9)
+
+    s.throttle()
+    assert s.rpm == 5.0
+
+    for _ in range(20):
+        s.relax()
+
+    assert s.rpm == 10.0
+
+
+def test_throttle_pauses_grants(monkeypatch):
+
+    monkeypatch.setattr(scheduler_module, "THROTTLE_PAUSE", 5.0)
+
+    s = Scheduler(rpm=10, tpm=10**9)
+    s.throttle()
+
+    with pytest.raises(QueueTimeout):
+        s.acquire("a", "grounded", 10, timeout=0.1)
+
+
+def _grant_order(s: Scheduler, waiting: list[tuple]) -> list:
+    """
+    Zaplní limit, zařadí čekající (chat, krok) a po uvolnění
+    vrátí pořadí, v jakém dostaly přidělení.
+    """
+    s.acquire("blocker", "grounded", 0)
+
+    order = []
+    lock = threading.Lock()
+    threads = []
+
+    def worker(chat, step):
+        s.acquire(chat, step, 0, timeout=5)
+        with lock:
+            order.append((chat, step))
+
+    for chat, step in waiting:
+        t = threading.Thread(target=worker, args=(chat, step))
+        t.start()
+        threads.append(t)
+
+        # deterministické pořadí zařazení
+        while len(s._queue) < len(threads):
+            threading.Event().wait(0.005)
+
+    with s._cond:
+        s.rpm = s.max_rpm = 100
+        s._cond.notify_all()
+
+    for t in threads:
+        t.join()
+
+    return order
+
+
+def test_grounded_before_reasoner():
+
+    order = _grant_order(Scheduler(rpm=1, tpm=10**9), [
+        ("a", "reasoner"),
+        ("b", "grounded"),
+    ])
+
+    assert order == [("b", "grounded"), ("a", "reasoner")]
+
+
+def test_fair_between_chats():
+
+    order = _grant_order(Scheduler(rpm=1, tpm=10**9), [
+        ("spam", "grounded"),
+        ("spam", "grounded"),
+        ("spam", "grounded"),
+        ("quiet", "grounded"),
+    ])
+
+    # tichý chat nečeká za celou dávkou spamujícího
+    assert order.index(("quiet", "grounded")) <= 1
+
+
+def test_is_rate_limited():
+
+    class E(Exception):
+        code = 429
+
+    assert is_rate_limited(E())
+    assert is_rate_limited(RuntimeError("RESOURCE_EXHAUSTED: quota"))
+    assert not is_rate_limited(RuntimeError("500 internal"))
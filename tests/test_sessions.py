@@ -0,0 +1,57 @@
+# tests/test_sessions.py
+
+import os
+
+import pytest
+
+import sessions
+from eval_retrieval import module_constants, topic_questions
+from ux.allowed_questions import ALLOWED_QUESTIONS
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TOPIC_QUESTIONS = topic_questions(
+    module_constants(os.path.join(ROOT, "query.py"), "TOPICS")["TOPICS"]
+)
+
+
+# ---------- FOLLOW-UP ----------
+@pytest.mark.parametrize("question", [
+    q for qs in ALLOWED_QUESTIONS.values() for q in qs
+] + TOPIC_QUESTIONS)
+def test_standalone_questions_are_not_follow_ups(question):
+    assert not sessions.is_follow_up(question)
+
+
+@pytest.mark.parametrize("question", [
+    "Proč lidé ztrácejí soukromí?",
+    "Co je to viralita?",
+    "Kdo tam vydělává?",
+    "Jak to funguje s monetizací?",
+    "A co monetizace?",
+    "I malí tvůrci?",
+    "monetizace",
+])
+def test_short_content_questions_are_not_follow_ups(question):
+    assert not sessions.is_follow_up(question)
+
+
+@pytest.mark.parametrize("question", [
+    "a proč?", "A proč?", "a proc", "A co dál?", "co dál", "proč?",
+    "Proč to?", "a tohle?", "Co to je?", "Jak to myslíš?", "a co s tím?",
+])
+def test_anaphoric_questions_are_follow_ups(question):
+    assert sessions.is_follow_up(question)
+
+
+# ---------- STORE ----------
+def test_memory_store_keeps_last_turns():
+
+    store = sessions.MemorySessionStore(max_turns=2, ttl=60)
+
+    for n in range(3):
+        store.add("chat", sessions.make_turn(f"otázka {n}", [n], ["raw"]))
+
+    assert store.last("chat").question == "otázka 2"
+    assert store.last("jiný") is None
@@ -0,0 +1,100 @@
+# tests/test_singleflight.py
+
+import time
+import threading
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def _run_concurrently(flight, key, fn, n):
+    """
+    n volajících se stejným klíčem; leader čeká, dokud se nepřipojí ostatní.
+    """
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    return results, errors
+
+
+def _gated(flight, n, outcome):
+
+    calls = []
+
+    def fn():
+        calls.append(1)
+        # počkej, až se ostatní přidají ke stejnému letu
+        while flight.stats["coalesced"] < n - 1:
+            time.sleep(0.001)
+        return outcome()
+
+    return fn, calls
+
+
+def test_concurrent_callers_share_one_result():
+
+    flight = SingleFlight()
+    fn, calls = _gated(flight, 4, lambda: "odpověď")
+
+    results, errors = _run_concurrently(flight, "q", fn, 4)
+
+    assert errors == []
+    assert len(calls) == 1
+    assert sorted(results) == [("odpověď", False)] + [("odpověď", True)] * 3
+    assert flight.stats == {"leaders": 1, "coalesced": 3}
+    assert flight.in_flight() == 0
+
+
+def test_leader_error_propagates_to_every_waiter():
+
+    flight = SingleFlight()
+
+    def boom():
+        raise RuntimeError("gemini 503")
+
+    fn, calls = _gated(flight, 3, boom)
+
+    results, errors = _run_concurrently(flight, "q", fn, 3)
+
+    assert results == []
+    assert len(calls) == 1
+    assert len(errors) == 3
+    assert all(str(e) == "gemini 503" for e in errors)
+
+    # chyba se necachuje – další volání počítá znovu
+    assert flight.in_flight() == 0
+    assert flight.do("q", lambda: "znovu") == ("znovu", False)
+
+
+def test_different_keys_do_not_coalesce():
+
+    flight = SingleFlight()
+
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+    assert flight.stats["coalesced"] == 0
+
+
+def test_base_exceptions_release_the_key():
+
+    flight = SingleFlight()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        flight.do("q", interrupted)
+
+    assert flight.in_flight() == 0
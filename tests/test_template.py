@@ -0,0 +1,82 @@
+# tests/test_template.py
+
+import template
+
+
+VALID = """- TITUL: Ztráta soukromí
+
+- PERCEPTUÁLNÍ KOTVY:
+  RIZIKOVÁ HUSTOTA: vysoká
+  VOLATILITA PROSTŘEDÍ: střední
+  PREDIKOVATELNOST: nízká
+
+🔹 Mechanismus: pozornost se přesouvá z obsahu na osobu [RAW|raw/a.txt]
+
+- CALIBRATION SCORE: 2"""
+
+
+def test_valid_output_is_untouched():
+
+    assert template.check(VALID) == []
+    assert template.repair(VALID, "Proč?") == (VALID, [])
+
+
+def test_missing_blocks_are_filled_in():
+
+    text, fixes = template.repair(
+        "🔹 Mechanismus: x\nRIZIKOVÁ HUSTOTA: vysoká",
+        "Proč lidé ztrácejí soukromí po virálu?"
+    )
+
+    assert fixes == ["titul", "kotvy", "calibration"]
+    assert template.check(text) == []
+
+    assert text.startswith("- TITUL: Proč lidé ztrácejí soukromí po virálu\n")
+
+    # existující řádek kotvy se převezme, chybějící jsou „neurčeno“
+    assert "  RIZIKOVÁ HUSTOTA: vysoká" in text
+    assert "  PREDIKOVATELNOST: neurčeno" in text
+    assert text.count("RIZIKOVÁ HUSTOTA") == 1
+
+    # doplněné skóre 1 → poznámka o spekulaci
+    assert "CALIBRATION SCORE: 1" in text
+    assert template.LOW_CALIBRATION_NOTE in text
+
+
+def test_missing_cards_are_reported_not_invented():
+
+    text, fixes = template.repair(VALID.replace("🔹 Mechanismus", "🔹 Něco"))
+
+    assert fixes == ["karty"]
+    assert "Mechanismus" not in text
+
+
+def test_long_output_is_cut_at_block_and_keeps_calibration():
+
+    cards = "\n\n".join(f"🔹 Mechanismus: {i} " + "x" * 200 for i in range(20))
+    long = VALID.replace("🔹 Mechanismus: pozornost se přesouvá z obsahu na osobu", cards)
+
+    text, fixes = template.repair(long, limit=1000)
+
+    assert fixes == ["zkráceno"]
+    assert len(text) <= 1000
+    assert template.TRUNCATED in text
+
+    # zdroj z useknuté části zůstane v seznamu, skóre až na konci
+    assert "Zdroje: [RAW|raw/a.txt]" in text
+    assert text.endswith("- CALIBRATION SCORE: 2")
+
+    # řez na hranici bloku – žádná useknutá karta
+    body = text.split(template.TRUNCATED)[0].rstrip()
+    assert body.endswith("x" * 200)
+
+
+def test_truncation_sources_fall_back_to_evidence():
+
+    long = VALID.replace(" [RAW|raw/a.txt]", "") + "\n\n" + "y " * 2000
+    evidence = [{"layer": "synth", "source": "synth/b.txt", "text": "…"}]
+
+    text, fixes = template.repair(long, evidence=evidence, limit=800)
+
+    assert "zkráceno" in fixes
+    assert "Zdroje: [SYNTH|synth/b.txt]" in text
@@ -0,0 +1,73 @@
+# tests/test_vector_store.py
+
+import numpy as np
+import pytest
+
+import classifier
+import vector_store
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((300, 32)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("storage", vector_store.STORAGES)
+def test_batch_search_matches_single(vectors, storage):
+
+    store = vector_store.build(vectors, storage)
+
+    distances, indices = store.search(vectors[:5], 4)
+
+    assert distances.shape == indices.shape == (5, 4)
+
+    for row, v in enumerate(vectors[:5]):
+        d, i = store.search(v, 4)
+        np.testing.assert_array_equal(indices[row], i[0])
+        np.testing.assert_allclose(distances[row], d[0], rtol=1e-5)
+
+    # každý vektor najde sám sebe
+    assert list(indices[:, 0]) == [0, 1, 2, 3, 4]
+
+
+def test_rerank_pads_like_faiss(vectors):
+
+    store = vector_store.build(vectors[:3], "sq8")
+    distances, indices = store.search(vectors[:2], 5)
+
+    assert (indices[:, 3:] == -1).all()
+    assert (indices[:, :3] >= 0).all()
+
+
+def test_layer_centroids_round_trip(vectors, tmp_path):
+
+    layers = ["raw", "synth", "meta"] * 100
+    centroids = classifier.chunk_centroids(vectors, layers)
+
+    store = vector_store.build(vectors, "sq8")
+    vector_store.save(store, str(tmp_path), layer_centroids=centroids)
+    loaded = vector_store.load(str(tmp_path))
+
+    assert sorted(loaded.layer_centroids) == ["meta", "raw", "synth"]
+
+    # uložené centroidy dají stejné centroidy klasifikátoru jako vektory
+    question_vecs = {"raw": vectors[:2]}
+    expected = classifier.build_centroids(question_vecs, vectors, layers)
+    got = classifier.combine_centroids(question_vecs, loaded.layer_centroids)
+
+    assert got[0] == expected[0]
+    np.testing.assert_allclose(got[1], expected[1], atol=1e-6)
+
+
+def test_index_without_centroids_and_rerank_bytes(vectors, tmp_path):
+
+    store = vector_store.build(vectors, "flat")
+    vector_store.save(store, str(tmp_path))
+    loaded = vector_store.load(str(tmp_path))
+
+    assert loaded.layer_centroids is None
+    assert loaded.rerank_bytes() == 0
+
+    assert vector_store.build(vectors, "binary").rerank_bytes() == vectors.nbytes
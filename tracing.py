@@ -0,0 +1,173 @@
+# tracing.py
+
+import os
+import json
+import time
+import uuid
+import threading
+
+
+# ---------- CONFIG ----------
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") != "0"
+
+TRACE_LOG = os.getenv("TRACE_LOG", os.path.join("logs", "traces.jsonl"))
+
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(5 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.getenv("TRACE_BACKUPS", "3"))
+
+
+_lock = threading.Lock()
+
+# poslední dokončená trace ve vlákně (batch režim main.py)
+_local = threading.local()
+
+
+# ---------- TRACE ----------
+def new_trace(question: str, chat_id=None) -> dict:
+    """
+    Jeden záznam = jeden dotaz do ask().
+    """
+    return {
+        "id": uuid.uuid4().hex[:16],
+        "ts": round(time.time(), 3),
+        "question": question,
+        "chat": chat_id,
+        "layers": [],
+        "chunks": [],
+        "distances": [],
+        "prompt_chars": 0,
+        "llm": [],
+        "path": None,
+        "total_s": None,
+        "_t0": time.perf_counter(),
+    }
+
+
+def record_retrieval(trace: dict, layers, indices, distances):
+
+    trace["layers"] = list(layers)
+    trace["chunks"] = [int(i) for i in indices]
+    # None = chunk přišel jen z lexikálního (BM25) vyhledávání
+    trace["distances"] = [
+        None if d is None else round(float(d), 4)
+        for d in distances
+    ]
+
+
+def record_followup(trace: dict, effective_question: str):
+    """
+    Doplňující otázka: prompt stojí na otázce z minulého kola – replay
+    ji potřebuje celou, spolu s převzatými chunky (record_retrieval).
+    """
+    trace["followup"] = True
+    trace["effective_question"] = effective_question
+
+
+def record_llm(trace: dict, step: str, model: str, prompt_chars: int,
+               seconds: float, outcome: str):
+    """
+    outcome: ok | empty | nedolozeno | max_tokens | error | timeout | circuit_open
+    """
+    if trace is None:
+        return
+
+    trace["prompt_chars"] = max(trace["prompt_chars"], prompt_chars)
+
+    trace["llm"].append({
+        "step": step,
+        "model": model,
+        "prompt_chars": prompt_chars,
+        "s": round(seconds, 3),
+        "outcome": outcome,
+    })
+
+
+def finish(trace: dict):
+
+    t0 = trace.pop("_t0", None)
+
+    if t0 is not None:
+        trace["total_s"] = round(time.perf_counter() - t0, 3)
+
+    _local.last = trace
+
+    if TRACE_ENABLED:
+        _append(trace)
+
+
+def last_trace():
+    """
+    Trace posledního ask() v aktuálním vlákně.
+    """
+    return getattr(_local, "last", None)
+
+
+# ---------- ROTATING LOG ----------
+def _rotate(path: str):
+
+    for i in range(TRACE_BACKUPS - 1, 0, -1):
+        src = f"{path}.{i}"
+        if os.path.exists(src):
+            os.replace(src, f"{path}.{i + 1}")
+
+    if TRACE_BACKUPS > 0:
+        os.replace(path, f"{path}.1")
+    else:
+        os.remove(path)
+
+
+def _append(trace: dict):
+
+    line = json.dumps(trace, ensure_ascii=False, separators=(",", ":"))
+
+    try:
+        with _lock:
+            folder = os.path.dirname(TRACE_LOG)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+
+            if (
+                os.path.exists(TRACE_LOG)
+                and os.path.getsize(TRACE_LOG) > TRACE_MAX_BYTES
+            ):
+                _rotate(TRACE_LOG)
+
+            with open(TRACE_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    except OSError as e:
+        # trasování nesmí shodit odpověď
+        print("TRACE ERROR:", e)
+
+
+# ---------- READ ----------
+def iter_traces(path: str = TRACE_LOG):
+    """
+    Od nejstarších po nejnovější, včetně rotovaných souborů.
+    """
+    files = [f"{path}.{i}" for i in range(TRACE_BACKUPS, 0, -1)] + [path]
+
+    for name in files:
+        if not os.path.exists(name):
+            continue
+
+        with open(name, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def find_trace(trace_id: str, path: str = TRACE_LOG):
+
+    found = None
+
+    for t in iter_traces(path):
+        if t.get("id", "").startswith(trace_id):
+            found = t
+
+    return found
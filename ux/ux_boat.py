@@ -1,3 +1,15 @@
+TOO_GENERAL_NOTE = (
+    "Poznámka: Dotaz je velmi obecný. "
+    "Systém pracuje lépe s otázkami typu "
+    "„jaké vzorce“, „co bylo pozorováno“, „co nevíme“."
+)
+
+NO_ADVICE_NOTE = (
+    "Poznámka: Tento nástroj neposkytuje rady. "
+    "Odpovídá pouze popisem pozorovaných jevů a vzorců."
+)
+
+
 def ux_preprocess(question: str):
     q = question.strip()
 
@@ -9,19 +21,12 @@ def ux_preprocess(question: str):
 
     # příliš obecné / emoční
     if len(q.split()) < 3:
-        result["note"] = (
-            "Poznámka: Dotaz je velmi obecný. "
-            "Systém pracuje lépe s otázkami typu "
-            "„jaké vzorce“, „co bylo pozorováno“, „co nevíme“."
-        )
+        result["note"] = TOO_GENERAL_NOTE
 
     if any(x in q.lower() for x in [
         "co mám dělat", "mám to vzít", "poradíš", "pomoz"
     ]):
-        result["note"] = (
-            "Poznámka: Tento nástroj neposkytuje rady. "
-            "Odpovídá pouze popisem pozorovaných jevů a vzorců."
-        )
+        result["note"] = NO_ADVICE_NOTE
 
     return result
 
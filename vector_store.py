@@ -0,0 +1,244 @@
+# vector_store.py
+#
+# Úložiště vektorů pro retrieval:
+#   flat    – IndexFlatL2, plné float32 (původní chování)
+#   fp16    – IndexScalarQuantizer QT_fp16     (½ paměti)
+#   sq8     – IndexScalarQuantizer QT_8bit     (¼ paměti)
+#   binary  – IndexBinaryFlat nad znaménky     (1/32 paměti)
+#
+# U komprimovaných variant se vezme RERANK_FACTOR[storage]× víc kandidátů
+# a přeřadí se přesnou L2 vzdáleností nad vectors.npy (mmap – do RAM
+# se načtou jen řádky kandidátů).
+#
+# meta.json nese i centroidy chunků po vrstvách (build_index.py), aby
+# klasifikátor při startu nemusel číst celý vectors.npy do RAM.
+
+import os
+import json
+
+import numpy as np
+import faiss
+
+
+# ---------- CONFIG ----------
+STORAGES = ["flat", "fp16", "sq8", "binary"]
+
+# kolikrát víc kandidátů vzít před přesným přeřazením
+RERANK_FACTOR = {
+    "fp16": 2,
+    "sq8": 4,
+    "binary": 16,
+}
+
+META_FILE = "meta.json"
+FLAT_FILE = "faiss.index"
+BINARY_FILE = "faiss_binary.index"
+VECTORS_FILE = "vectors.npy"
+
+# index čtený přes mmap – stránky v RAM jen podle potřeby (LOW_MEMORY)
+FAISS_MMAP = os.getenv("FAISS_MMAP", "0") == "1"
+
+_SQ_TYPES = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+def _to_bits(vectors):
+    return np.packbits(vectors > 0, axis=1)
+
+
+# ---------- STORE ----------
+class VectorStore:
+
+    def __init__(self, storage: str, index, exact=None, path: str = None,
+                 layer_centroids: dict = None):
+        self.storage = storage
+        self.index = index
+        self.exact = exact          # float32 matice (mmap) pro re-ranking
+        self.path = path
+        self.layer_centroids = layer_centroids   # {vrstva: vektor} z meta.json
+        self.ntotal = index.ntotal
+        self.d = exact.shape[1] if exact is not None else index.d
+
+    def search(self, q_vecs, k: int, rerank: bool = True):
+        """
+        Stejné API jako faiss: (distances, indices), tvar (n, k), L2².
+        q_vecs = jeden vektor (d,) nebo matice (n, d) – jedno hledání pro dávku.
+        """
+        q_vecs = np.asarray(q_vecs, dtype="float32").reshape(-1, self.d)
+
+        if self.storage == "flat" or self.exact is None or not rerank:
+            return self._raw_search(q_vecs, k)
+
+        factor = RERANK_FACTOR.get(self.storage, 4)
+        _, cand = self._raw_search(q_vecs, min(self.ntotal, k * factor))
+
+        # doplnění jako faiss: -1 a „nekonečná“ vzdálenost
+        distances = np.full((len(q_vecs), k), np.finfo("float32").max, dtype="float32")
+        indices = np.full((len(q_vecs), k), -1, dtype="int64")
+
+        for row, (q, c) in enumerate(zip(q_vecs, cand)):
+            # seřazená id → sekvenční čtení z mmap
+            ids = np.sort(c[c >= 0])
+
+            dist = ((np.asarray(self.exact[ids]) - q) ** 2).sum(axis=1)
+            best = np.argsort(dist)[:k]
+
+            distances[row, :len(best)] = dist[best]
+            indices[row, :len(best)] = ids[best]
+
+        return distances, indices
+
+    def _raw_search(self, q_vec, k):
+
+        if self.storage == "binary":
+            return self.index.search(_to_bits(q_vec), k)
+
+        return self.index.search(q_vec, k)
+
+    def vectors(self):
+        """
+        Všechny vektory (report, centroidy u indexu bez nich v meta.json).
+        """
+        if self.exact is not None:
+            return np.asarray(self.exact)
+
+        return self.index.reconstruct_n(0, self.ntotal)
+
+    def memory_bytes(self) -> int:
+        """
+        Odhad rezidentní paměti indexu (bez mmap souboru s přesnými vektory).
+        """
+        per_vector = {
+            "flat": self.d * 4,
+            "fp16": self.d * 2,
+            "sq8": self.d,
+            "binary": self.d // 8,
+        }[self.storage]
+
+        return per_vector * self.ntotal
+
+    def rerank_bytes(self) -> int:
+        """
+        Velikost přesných vektorů pro re-ranking (vectors.npy, mmap –
+        v RAM jen stránky kandidátů, na disku celé).
+        """
+        if self.exact is None:
+            return 0
+
+        return self.ntotal * self.d * 4
+
+
+# ---------- BUILD ----------
+def build(vectors, storage: str = "flat"):
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    d = vectors.shape[1]
+
+    if storage == "flat":
+        index = faiss.IndexFlatL2(d)
+
+    elif storage in _SQ_TYPES:
+        index = faiss.IndexScalarQuantizer(d, _SQ_TYPES[storage], faiss.METRIC_L2)
+        index.train(vectors)
+
+    elif storage == "binary":
+        index = faiss.IndexBinaryFlat(d)
+        index.add(_to_bits(vectors))
+        return VectorStore(storage, index, exact=vectors)
+
+    else:
+        raise ValueError(f"Neznámé úložiště: {storage} (možnosti: {STORAGES})")
+
+    index.add(vectors)
+
+    return VectorStore(storage, index, exact=None if storage == "flat" else vectors)
+
+
+def save(store: VectorStore, index_dir: str, layer_centroids: dict = None):
+
+    if store.storage == "binary":
+        path = os.path.join(index_dir, BINARY_FILE)
+        faiss.write_index_binary(store.index, path)
+    else:
+        path = os.path.join(index_dir, FLAT_FILE)
+        faiss.write_index(store.index, path)
+
+    vectors_path = os.path.join(index_dir, VECTORS_FILE)
+
+    if store.exact is not None:
+        np.save(vectors_path, np.asarray(store.exact, dtype="float32"))
+    elif os.path.exists(vectors_path):
+        os.remove(vectors_path)
+
+    meta = {"storage": store.storage, "dim": store.d}
+
+    if layer_centroids:
+        meta["layer_centroids"] = {
+            layer: np.asarray(v, dtype="float32").tolist()
+            for layer, v in layer_centroids.items()
+        }
+
+    with open(os.path.join(index_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    store.path = path
+    store.layer_centroids = layer_centroids
+
+
+def _read_index(path: str):
+
+    if not FAISS_MMAP:
+        return faiss.read_index(path)
+
+    # IO_FLAG_MMAP flat/SQ index stejně načte celý do RAM; mapuje až
+    # IO_FLAG_MMAP_IFC (starší faiss ho nemá → běžné načtení)
+    flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+    if flag is None:
+        return faiss.read_index(path)
+
+    try:
+        return faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError as e:
+        # typ indexu mmap nepodporuje → běžné načtení
+        print("FAISS MMAP OFF:", e)
+        return faiss.read_index(path)
+
+
+def load(index_dir: str) -> VectorStore:
+    """
+    Bez meta.json → původní flat faiss.index (bez centroidů).
+    """
+    meta_path = os.path.join(index_dir, META_FILE)
+
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+    storage = meta.get("storage", "flat")
+
+    # starší index bez centroidů → retrieval je spočítá z vectors()
+    layer_centroids = None
+    if "layer_centroids" in meta:
+        layer_centroids = {
+            layer: np.asarray(v, dtype="float32")
+            for layer, v in meta["layer_centroids"].items()
+        }
+
+    if storage == "binary":
+        path = os.path.join(index_dir, BINARY_FILE)
+        index = faiss.read_index_binary(path)
+    else:
+        path = os.path.join(index_dir, FLAT_FILE)
+        index = _read_index(path)
+
+    exact = None
+    vectors_path = os.path.join(index_dir, VECTORS_FILE)
+
+    if storage != "flat" and os.path.exists(vectors_path):
+        exact = np.load(vectors_path, mmap_mode="r")
+
+    return VectorStore(storage, index, exact=exact, path=path,
+                       layer_centroids=layer_centroids)